@@ -1,8 +1,8 @@
 from __future__ import annotations
-from enum import Enum
+from enum import Enum, IntEnum
 
 
-class UserState(Enum):
+class UserState(IntEnum):
     idle = 1
     search_movie = 2
     input_search_filter = 3
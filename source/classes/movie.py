@@ -1,4 +1,5 @@
 from __future__ import annotations
+from functools import cached_property
 from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
@@ -50,6 +51,22 @@ class Movie:
             for value in (self.year, self.length, self.rating, self.votes)
         )
 
+    @cached_property
+    def formatted_basic_info(self) -> str:
+        """Year, length and tags shown at the top of the movie details (built once per movie)."""
+        basic_info_parts = []
+        if self.year:
+            basic_info_parts.append(f"{self.year}r")
+        if self.length:
+            basic_info_parts.append(f"{self.length}min")
+        if self.tags:
+            basic_info_parts.append(self.tags)
+        return "\u2004|\u2004".join(basic_info_parts)
+
+    @cached_property
+    def rating_display(self) -> str:
+        return f"{self.rating}/10" if self.rating else "N/A"
+
     def to_payload(self) -> MoviePayload:
         return {
             'title': self.title,
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import heapq
 import time
 from difflib import SequenceMatcher
-from typing import TYPE_CHECKING, List, Optional, Dict
+from operator import itemgetter
+from typing import TYPE_CHECKING, List, Optional, Dict, Callable, Any
 
 import pyuca
 from Levenshtein import distance
@@ -49,7 +51,16 @@ def simple_match_percentage(s1: str, s2: str) -> float:
 
 collator = pyuca.Collator()
 
+# Custom mapping for characters to adjust their sort order without using locale or pyicu
+TITLE_SORT_TABLE = str.maketrans({
+    'ł': 'l🧑', 'ą': 'a🧑', 'ć': 'c🧑', 'ę': 'e🧑', 'ó': 'o🧑', 'ś': 's🧑', 'ź': 'z🧑', 'ż': 'z🧑',
+    'Ł': 'L🧑', 'Ą': 'A🧑', 'Ć': 'C🧑', 'Ę': 'E🧑', 'Ó': 'O🧑', 'Ś': 'S🧑', 'Ź': 'Z🧑', 'Ż': 'Z🧑',
+})
+
 class MovieSite:
+    _search_titles: Optional[List[str]] = None  # Class default, so unpickled objects build it lazily too
+    _positions: Optional[Dict[int, int]] = None
+
     def __init__(self, name: str, data: List[MoviePayload]) -> None:
         self.name: str = name
         self.movies: List[Movie] = [Movie(site=self, data=d) for d in data]
@@ -59,18 +70,26 @@ class MovieSite:
         return self.name
 
     def _get_sort_key(self, title: str):
-        preprocessed_title = self._preprocess_title(title)
-        if preprocessed_title not in self._sort_title_cache:
-            self._sort_title_cache[preprocessed_title] = collator.sort_key(preprocessed_title)
-        return self._sort_title_cache[preprocessed_title]
+        # Cached by the title itself, so a cache hit skips the preprocessing too
+        sort_key = self._sort_title_cache.get(title)
+        if sort_key is None:
+            sort_key = self._sort_title_cache[title] = collator.sort_key(self._preprocess_title(title))
+        return sort_key
 
     def _preprocess_title(self, title: str) -> str:
-        # Custom mapping for characters to adjust their sort order without using locale or pyicu
-        custom_mapping = {
-            'ł': 'l🧑', 'ą': 'a🧑', 'ć': 'c🧑', 'ę': 'e🧑', 'ó': 'o🧑', 'ś': 's🧑', 'ź': 'z🧑', 'ż': 'z🧑',
-            'Ł': 'L🧑', 'Ą': 'A🧑', 'Ć': 'C🧑', 'Ę': 'E🧑', 'Ó': 'O🧑', 'Ś': 'S🧑', 'Ź': 'Z🧑', 'Ż': 'Z🧑',
-        }
-        return ''.join(custom_mapping.get(char, char) for char in title)
+        return title.translate(TITLE_SORT_TABLE)
+
+    def _get_search_titles(self) -> List[str]:
+        """Return lowercase movie titles (aligned with self.movies), computed once per movies list."""
+        if self._search_titles is None:
+            self._search_titles = [movie.title.lower() for movie in self.movies]
+        return self._search_titles
+
+    def _get_positions(self) -> Dict[int, int]:
+        """Return the index of every movie in self.movies keyed by id(movie), computed once per movies list."""
+        if self._positions is None:
+            self._positions = {id(movie): i for i, movie in enumerate(self.movies)}
+        return self._positions
 
     def add_movies(self, new_movies: List[MoviePayload], duplicates: bool = True):
         """Add new movies to the list."""
@@ -78,6 +97,8 @@ class MovieSite:
             new_movie = Movie(site=self, data=data)
             if duplicates or new_movie not in self.movies:
                 self.movies.append(new_movie)
+        self._search_titles = None
+        self._positions = None
 
     def filter_invalid_movies(self) -> MovieSite:
         incorrect_movies = [movie for movie in self.movies if not movie.is_valid()]
@@ -93,30 +114,51 @@ class MovieSite:
 
     def get_movies_sorted_by_rating(self, max_items: Optional[int] = None, reverse: bool = False) -> List[Movie]:
         """Return a list of movies sorted by rating."""
-        sorted_movies = sorted(
-            self.movies,
-            key=lambda m: (replace_none(m.rating), self._get_sort_key(m.title))
-            if not reverse
-            else (-replace_none(m.rating), self._get_sort_key(m.title)),
-            reverse=False  # Sort by the primary key as adjusted
-        )
+        key, reverse_sort = self._get_sort_function('rating', reverse)
+        sorted_movies = sorted(self.movies, key=key, reverse=reverse_sort)
         return sorted_movies[:max_items] if max_items is not None else sorted_movies
 
     def get_movies_sorted_by_year(self, max_items: Optional[int] = None, reverse: bool = False) -> List[Movie]:
         """Return a list of movies sorted by year."""
-        sorted_movies = sorted(
-            self.movies,
-            key=lambda m: (replace_none(m.year, 1900), self._get_sort_key(m.title))
-            if not reverse
-            else (-replace_none(m.year, 1900), self._get_sort_key(m.title)),
-            reverse=False  # Sort by the primary key as adjusted
-        )
+        key, reverse_sort = self._get_sort_function('year', reverse)
+        sorted_movies = sorted(self.movies, key=key, reverse=reverse_sort)
         return sorted_movies[:max_items] if max_items is not None else sorted_movies
 
     def get_movies_sorted_by_date_added(self, max_items: Optional[int] = None, reverse: bool = False) -> List[Movie]:
         """Retrieves and returns a list of movies sorted by their date of addition."""
-        sorted_movies = self.movies[::-1] if reverse else self.movies[:]
-        return sorted_movies[:max_items] if max_items is not None else sorted_movies
+        if max_items is None:
+            return self.movies[::-1] if reverse else self.movies[:]
+        return self.movies[:-max_items - 1:-1] if reverse else self.movies[:max_items]  # Copy only the head
+
+    def _get_sort_function(self, sort_key: str, reverse: bool) -> tuple[Callable[[Movie], Any], bool]:
+        """Return the (key, reverse) pair used by the get_movies_sorted_by_* method of the sort key."""
+        if sort_key == 'title':
+            return lambda m: self._get_sort_key(m.title), reverse
+        elif sort_key == 'rating':
+            if reverse:
+                return lambda m: (-replace_none(m.rating), self._get_sort_key(m.title)), False
+            return lambda m: (replace_none(m.rating), self._get_sort_key(m.title)), False
+        elif sort_key == 'year':
+            if reverse:
+                return lambda m: (-replace_none(m.year, 1900), self._get_sort_key(m.title)), False
+            return lambda m: (replace_none(m.year, 1900), self._get_sort_key(m.title)), False
+        raise ValueError(f"Unknown sort_key: {sort_key}")
+
+    def sort_matches(self, movies: List[Movie], sort_key: Optional[str], reverse: bool = False) -> List[Movie]:
+        """
+        Sort movies returned by search_movies with sort_key='match_score' by another sort key.
+
+        Gives the same list as repeating the search with limit_before_sort=True and that sort key,
+        without matching the titles again.
+        """
+        if not sort_key or sort_key == 'match_score':
+            return movies
+        positions = self._get_positions()
+        matched_movies = sorted(movies, key=lambda m: positions[id(m)])  # Order of addition, like in search_movies
+        if sort_key == 'date_added':
+            return matched_movies[::-1] if reverse else matched_movies
+        key, reverse_sort = self._get_sort_function(sort_key, reverse)
+        return sorted(matched_movies, key=key, reverse=reverse_sort)
 
     def filter_movies_by_tags(self, movies: List[Movie], selected_tags: List[str]) -> List[Movie]:
         """Filter movies by tags."""
@@ -124,7 +166,8 @@ class MovieSite:
 
     def filter_movies_by_years(self, movies: List[Movie], selected_years: List[int]) -> List[Movie]:
         """Filter movies by years."""
-        return [movie for movie in movies if movie.year in selected_years]
+        years = set(selected_years)
+        return [movie for movie in movies if movie.year in years]
 
     def search_movies(
             self,
@@ -163,50 +206,60 @@ class MovieSite:
         phrase_lower = phrase.lower() if phrase else ''
         movie_matches: Dict[Movie, float] = {}
 
-        for movie in self.movies:
-            title_lower = movie.title.lower()
-            smp = simple_match_percentage(phrase_lower, title_lower)
-            ldp = levenshtein_distance_percentage(phrase_lower, title_lower)
-            lcsp = longest_common_substring_percentage(phrase_lower, title_lower)
-            match_score = 15 * smp + 50 * ldp + 35 * lcsp
-            if match_score >= min_match_score:
-                movie_matches[movie] = match_score
+        # Apply filtering based on tags and years first, so only the movies that can be returned are scored
+        candidates = list(zip(self.movies, self._get_search_titles()))
+        if filter_tags:
+            candidates = [(movie, title) for movie, title in candidates if all(tag in movie.tags for tag in filter_tags)]
+        if filter_years:
+            years = set(filter_years)
+            candidates = [(movie, title) for movie, title in candidates if movie.year in years]
+
+        if not phrase_lower:
+            # Every matcher scores an empty phrase 0 - keep all movies (in order of addition) without running them
+            movie_matches = dict.fromkeys((movie for movie, title in candidates), 0.0) if min_match_score <= 0.0 else {}
+        else:
+            # Fast path: if some titles contain the phrase, score only those instead of fuzzy matching every title
+            substring_matches = [(movie, title) for movie, title in candidates if phrase_lower in title]
+            if substring_matches:
+                candidates = substring_matches
+
+            for movie, title_lower in candidates:
+                smp = simple_match_percentage(phrase_lower, title_lower)
+                ldp = levenshtein_distance_percentage(phrase_lower, title_lower)
+                if phrase_lower in title_lower:
+                    lcsp = 1.0  # The whole phrase is the longest common substring
+                else:
+                    lcsp = longest_common_substring_percentage(phrase_lower, title_lower)
+                match_score = 15 * smp + 50 * ldp + 35 * lcsp
+                if match_score >= min_match_score:
+                    movie_matches[movie] = match_score
 
         # Sort by match score
-        sorted_movies_with_scores = sorted(movie_matches.items(), key=lambda x: x[1], reverse=True)
+        sorted_movies_with_scores = sorted(movie_matches.items(), key=itemgetter(1), reverse=True)
 
         # Extract movies only
         movies_sorted_by_score = [movie for movie, score in sorted_movies_with_scores]
 
-        # Apply filtering based on tags and years
-        if filter_tags:
-            movies_sorted_by_score = self.filter_movies_by_tags(movies_sorted_by_score, filter_tags)
-        if filter_years:
-            movies_sorted_by_score = self.filter_movies_by_years(movies_sorted_by_score, filter_years)
-
         # Limit the number of items before sorting if limit_before_sort is True
         if limit_before_sort and max_items is not None:
             movies_sorted_by_score = movies_sorted_by_score[:max_items]
 
-        movie_set = set(movies_sorted_by_score)
-
-        # Sort based on the specified sort key
+        # Sort only the matched movies (kept in order of addition, like self.movies) by the specified sort key
         if not sort_key or sort_key == 'match_score':
             result_movies = movies_sorted_by_score
-        elif sort_key == 'title':
-            result_movies = self.get_movies_sorted_by_title(max_items=None, reverse=reverse)
-        elif sort_key == 'rating':
-            result_movies = self.get_movies_sorted_by_rating(max_items=None, reverse=reverse)
-        elif sort_key == 'year':
-            result_movies = self.get_movies_sorted_by_year(max_items=None, reverse=reverse)
-        elif sort_key == 'date_added':
-            result_movies = self.get_movies_sorted_by_date_added(max_items=None, reverse=reverse)
         else:
-            raise ValueError(f"Unknown sort_key: {sort_key}")
-
-        # Filter out movies that were not in the original sorted by score list
-        if sort_key != 'match_score':
-            result_movies = [m for m in result_movies if m in movie_set]
+            movie_set = set(movies_sorted_by_score)
+            matched_movies = [m for m in movie_matches if m in movie_set]
+            if sort_key == 'date_added':
+                result_movies = matched_movies[::-1] if reverse else matched_movies
+            else:
+                key, reverse_sort = self._get_sort_function(sort_key, reverse)
+                if not limit_before_sort and max_items is not None:
+                    # Partial sort: same result as sorted(...)[:max_items]
+                    select = heapq.nlargest if reverse_sort else heapq.nsmallest
+                    result_movies = select(max_items, matched_movies, key=key)
+                else:
+                    result_movies = sorted(matched_movies, key=key, reverse=reverse_sort)
 
         # Limit the number of items after sorting if limit_before_sort is False
         if not limit_before_sort and max_items is not None:
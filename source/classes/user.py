@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import asyncio
-from typing import List, Union, Optional
+from typing import List, Union, Optional, Dict, Any
 
 import discord
 
@@ -11,6 +11,12 @@ from classes.watchlist import Watchlist
 
 
 class User:
+    __slots__ = (
+        'id', 'name', 'display_name', 'state', 'movie_selection_list', 'selection_input', 'search_query',
+        'filter_tags', 'filter_years', 'sort_key_search', 'sort_ascending_search', 'sort_key_watchlist',
+        'sort_ascending_watchlist', 'message_id', 'interaction_task', 'watchlist',
+    )
+
     def __init__(self, member_id: int, name: str, display_name: str) -> None:
         self.id: int = member_id
         self.name: str = name
@@ -39,15 +45,70 @@ class User:
     def __str__(self) -> str:
         return self.name
 
+    def __setstate__(self, state) -> None:
+        # Slotted objects pickle as (None, slots); users pickled before __slots__ carry a plain __dict__
+        if isinstance(state, tuple):
+            state = state[1]
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def cancel_interaction_task(self) -> bool:
+        """Cancel the pending interaction task. Returns True if there was one."""
+        task = self.interaction_task
+        if task and not task.done():
+            task.cancel()
+            return True
+        return False
+
+    def replace_interaction_task(self, task: asyncio.Task) -> None:
+        """Cancel the pending interaction task (if any) and track the new one instead."""
+        self.cancel_interaction_task()
+        self.interaction_task = task
+
     def copy_without_task(self) -> User:
         """Create a copy of the User object with interaction_task set to None."""
         new_user = User(self.id, self.name, self.display_name)
         new_user.state = self.state
         new_user.movie_selection_list = self.movie_selection_list.copy()
         new_user.message_id = self.message_id
-        new_user.watchlist = self.watchlist
-        new_user.watchlist.user = new_user
+        new_user.watchlist = Watchlist(new_user)  # own Watchlist, so the live one keeps pointing at self
+        new_user.watchlist.entries = self.watchlist.entries.copy()
         new_user.interaction_task = None
         new_user.search_query = self.search_query
         new_user.selection_input = self.selection_input
         return new_user
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the persistent part of the User (no task, no selection list) to JSON-compatible types."""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'display_name': self.display_name,
+            'state': self.state.name,
+            'selection_input': self.selection_input,
+            'search_query': self.search_query,
+            'filter_tags': list(self.filter_tags),  # Copies - the snapshot is encoded in a worker thread
+            'filter_years': list(self.filter_years),
+            'sort_key_search': self.sort_key_search,
+            'sort_ascending_search': self.sort_ascending_search,
+            'sort_key_watchlist': self.sort_key_watchlist,
+            'sort_ascending_watchlist': self.sort_ascending_watchlist,
+            'message_id': self.message_id,
+            'watchlist': self.watchlist.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> User:
+        user = cls(data['id'], data['name'], data['display_name'])
+        user.state = UserState[data['state']]
+        user.selection_input = data['selection_input']
+        user.search_query = data['search_query']
+        user.filter_tags = data['filter_tags']
+        user.filter_years = data['filter_years']
+        user.sort_key_search = data['sort_key_search']
+        user.sort_ascending_search = data['sort_ascending_search']
+        user.sort_key_watchlist = data['sort_key_watchlist']
+        user.sort_ascending_watchlist = data['sort_ascending_watchlist']
+        user.message_id = data['message_id']
+        user.watchlist = Watchlist.from_dict(user, data['watchlist'])
+        return user
@@ -3,12 +3,14 @@ from __future__ import annotations
 import csv
 import io
 import logging
+import tempfile
 from datetime import date
-from typing import List, TYPE_CHECKING, Optional
+from typing import List, TYPE_CHECKING, Optional, Dict, Any, BinaryIO
 
 import pyuca
 
 from classes.movie import Movie
+from classes.movie_site import MovieSite, TITLE_SORT_TABLE
 
 if TYPE_CHECKING:
     from classes.user import User
@@ -19,58 +21,86 @@ def replace_none(value, default=0):
 
 collator = pyuca.Collator()
 
+CSV_SPOOL_SIZE = 256 * 1024  # CSV exports up to this size stay in memory, larger ones are written to a temporary file
+
 class Watchlist:
     def __init__(self, user: User) -> None:
         self.user: User = user
-        self.entries: List[MovieEntry] = []
+        self._entries: Dict[tuple, MovieEntry] = {}  # Movie key -> entry, in the order of adding
         self._sort_title_cache = {}
 
     def __repr__(self) -> str:
         cls_name = type(self).__name__
-        return f"{cls_name}(entries={len(self.entries)} movies)"
+        return f"{cls_name}(entries={len(self._entries)} movies)"
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        # Watchlists pickled before the entries were indexed store them as a plain list
+        entries = state.pop('entries', None)
+        self.__dict__.update(state)
+        if entries is not None:
+            self.entries = entries
+
+    @staticmethod
+    def _movie_key(movie: Movie) -> tuple:
+        """Key under which the movie is indexed, consistent with Movie.__eq__."""
+        return movie.title, movie.year
+
+    @property
+    def entries(self) -> List[MovieEntry]:
+        return list(self._entries.values())
+
+    @entries.setter
+    def entries(self, entries: List[MovieEntry]) -> None:
+        self._entries = {self._movie_key(entry.movie): entry for entry in entries}
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        return [entry.to_dict() for entry in self._entries.values()]
+
+    @classmethod
+    def from_dict(cls, user: User, data: List[Dict[str, Any]]) -> Watchlist:
+        """Rebuild a watchlist from `to_dict` output. Movies are attached to placeholder sites by name."""
+        watchlist = cls(user)
+        sites: Dict[str, MovieSite] = {}
+        watchlist.entries = [MovieEntry.from_dict(d, sites) for d in data]
+        return watchlist
 
     def _get_sort_key(self, title: str):
-        preprocessed_title = self._preprocess_title(title)
-        if preprocessed_title not in self._sort_title_cache:
-            self._sort_title_cache[preprocessed_title] = collator.sort_key(preprocessed_title)
-        return self._sort_title_cache[preprocessed_title]
+        # Cached by the title itself, so a cache hit skips the preprocessing too
+        sort_key = self._sort_title_cache.get(title)
+        if sort_key is None:
+            sort_key = self._sort_title_cache[title] = collator.sort_key(self._preprocess_title(title))
+        return sort_key
 
     def _preprocess_title(self, title: str) -> str:
         # Custom mapping for characters to adjust their sort order
-        custom_mapping = {
-            'ł': 'l🧑', 'ą': 'a🧑', 'ć': 'c🧑', 'ę': 'e🧑', 'ó': 'o🧑', 'ś': 's🧑', 'ź': 'z🧑', 'ż': 'z🧑',
-            'Ł': 'L🧑', 'Ą': 'A🧑', 'Ć': 'C🧑', 'Ę': 'E🧑', 'Ó': 'O🧑', 'Ś': 'S🧑', 'Ź': 'Z🧑', 'Ż': 'Z🧑',
-        }
-        return ''.join(custom_mapping.get(char, char) for char in title)
+        return title.translate(TITLE_SORT_TABLE)
 
     def add_movie(self, movie: Movie, rating: Optional[float] = None):
         if self.has_movie(movie):
-            logging.warning(f"Movie '{movie.title}' already exists in the watchlist entries. {repr(self.user)}.")
+            logging.warning("Movie '%s' already exists in the watchlist entries. %r.", movie.title, self.user)
             return
 
-        entry = MovieEntry(movie, rating)
-        self.entries.append(entry)
+        self._entries[self._movie_key(movie)] = MovieEntry(movie, rating)
 
     def remove_movie(self, movie: Movie):
-        self.entries = [entry for entry in self.entries if entry.movie != movie]
+        self._entries.pop(self._movie_key(movie), None)
 
     def has_movie(self, movie: Movie) -> bool:
         """Check if the movie is in the watchlist."""
-        return any(entry.movie == movie for entry in self.entries)
+        return self._movie_key(movie) in self._entries
 
     def update_rating(self, movie: Movie, new_rating: float):
-        for entry in self.entries:
-            if entry.movie == movie:
-                entry.rating = new_rating
-                break
+        entry = self._entries.get(self._movie_key(movie))
+        if entry is not None:
+            entry.rating = new_rating
 
     def get_entries_sorted_by_title(self, max_items: Optional[int] = None, reverse: bool = False) -> List[MovieEntry]:
-        sorted_entries = sorted(self.entries, key=lambda e: self._get_sort_key(e.movie.title), reverse=reverse)
+        sorted_entries = sorted(self._entries.values(), key=lambda e: self._get_sort_key(e.movie.title), reverse=reverse)
         return sorted_entries[:max_items] if max_items is not None else sorted_entries
 
     def get_entries_sorted_by_date(self, max_items: Optional[int] = None, reverse: bool = False) -> List[MovieEntry]:
         sorted_entries = sorted(
-            self.entries,
+            self._entries.values(),
             key=lambda e: (
                 (e.date_added, self._get_sort_key(e.movie.title))
                 if not reverse
@@ -82,7 +112,7 @@ class Watchlist:
 
     def get_entries_sorted_by_rating(self, max_items: Optional[int] = None, reverse: bool = False) -> List[MovieEntry]:
         sorted_entries = sorted(
-            self.entries,
+            self._entries.values(),
             key=(
                 lambda e: (replace_none(e.rating), self._get_sort_key(e.movie.title))
                 if not reverse
@@ -105,7 +135,7 @@ class Watchlist:
         return entries
 
     def get_movies(self, max_items: Optional[int] = None) -> List[Movie]:
-        movies = [entry.movie for entry in self.entries]
+        movies = [entry.movie for entry in self._entries.values()]
         return movies[:max_items] if max_items is not None else movies
 
     def get_movies_sorted_by_title(self, max_items: Optional[int] = None, reverse: bool = False) -> List[Movie]:
@@ -120,7 +150,7 @@ class Watchlist:
         sorted_entries = self.get_entries_sorted_by_rating(max_items, reverse)
         return [entry.movie for entry in sorted_entries]
 
-    def get_csv(self, sort_key: str = 'title', reverse: bool = False) -> io.BytesIO:
+    def get_csv(self, sort_key: str = 'title', reverse: bool = False) -> BinaryIO:
         # Sort the entries based on the provided key and order
         if sort_key == 'title':
             sorted_entries = self.get_entries_sorted_by_title(reverse=reverse)
@@ -130,24 +160,24 @@ class Watchlist:
             sorted_entries = self.get_entries_sorted_by_rating(reverse=reverse)
         else:
             sorted_entries = self.entries
-            logging.warning(f"Unknown sort_key '{sort_key}' provided. Using unsorted entries.")
+            logging.warning("Unknown sort_key '%s' provided. Using unsorted entries.", sort_key)
 
-        output = io.StringIO()
+        # Encode rows straight into the returned buffer instead of copying a finished str into it
+        byte_io = tempfile.SpooledTemporaryFile(max_size=CSV_SPOOL_SIZE)
+        output = io.TextIOWrapper(byte_io, encoding='utf-8', newline='')
         writer = csv.writer(output, delimiter=';')
 
         # Write CSV header
         writer.writerow(['Tytuł', 'Data dodania', 'Ocena'])
 
         # Write data rows
-        for entry in sorted_entries:
-            title = entry.movie.title
-            date_added = entry.date_added
-            rating = entry.rating if entry.rating is not None else 'Brak'
-            writer.writerow([title, date_added, rating])
-
-        # Convert the StringIO to BytesIO
-        output.seek(0)
-        byte_io = io.BytesIO(output.getvalue().encode('utf-8'))
+        writer.writerows(
+            (entry.movie.title, entry.date_added, entry.rating if entry.rating is not None else 'Brak')
+            for entry in sorted_entries
+        )
+
+        output.flush()
+        output.detach()  # Keep byte_io open when the wrapper is collected
         byte_io.seek(0)
         return byte_io
 
@@ -161,3 +191,19 @@ class MovieEntry:
     def __repr__(self):
         cls_name = type(self).__name__
         return f"{cls_name}(movie={self.movie.title}, rating={self.rating}, date_added={self.date_added})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'site': self.movie.site.name,
+            'movie': self.movie.to_payload(),
+            'rating': self.rating,
+            'date_added': self.date_added.isoformat(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], sites: Dict[str, MovieSite]) -> MovieEntry:
+        site_name = data['site']
+        if site_name not in sites:
+            sites[site_name] = MovieSite(name=site_name, data=[])
+        movie = Movie(site=sites[site_name], data=data['movie'])
+        return cls(movie, data['rating'], date.fromisoformat(data['date_added']))
@@ -1,19 +1,29 @@
+import asyncio
+import hashlib
 import importlib
+import json
 import logging
 import os
 import pickle
+import sqlite3
 from datetime import datetime
 from math import ceil
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 
+import aiohttp
 import pandas as pd
 
 from classes.movie_site import MovieSite
+from classes.user import User
+from config import HTTP_HEADERS
 
 SITES_DATA_PATH = "source/data/sites"
+SITES_VALIDATORS_PATH = f"{SITES_DATA_PATH}/validators.json"  # HTTP cache validators (ETag, Last-Modified)
 SCRAPE_URLS = {
     "cda-hd": "https://cda-hd.cc/filmy-online"
 }
+PICKLE_BUFFER_SIZE = 1 << 20  # File buffer for pickles - far fewer read/write calls than the default 8 KiB
+USER_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))  # Compact rows of the users table
 
 
 async def collect_data() -> List[MovieSite]:
@@ -22,8 +32,18 @@ async def collect_data() -> List[MovieSite]:
     # Load existing data
     existing_data = load_scraped_data(sites)
 
+    # Skip sites that haven't changed since the last scraping
+    validators = load_site_validators()
+    changed_validators = await check_sites_modified(SCRAPE_URLS, validators)
+    if not changed_validators:
+        logging.info("No site was modified since the last scraping.")
+        return existing_data
+
     # Run scripts that collects new data
-    await scrape_new_data(SCRAPE_URLS, max_pages=1, data=existing_data)
+    changed_urls = {w_name: SCRAPE_URLS[w_name] for w_name in changed_validators}
+    scraped = await scrape_new_data(changed_urls, max_pages=1, data=existing_data)
+    # A failed scraping keeps the old validators, so the site is scraped again next time
+    save_site_validators({**validators, **{w_name: changed_validators[w_name] for w_name in scraped}})
 
     # Reload data
     data = load_scraped_data(sites)
@@ -31,28 +51,89 @@ async def collect_data() -> List[MovieSite]:
     return data
 
 
-async def scrape_new_data(urls: Dict[str, str], max_pages: int | None, data: List[MovieSite]) -> None:
+async def check_sites_modified(urls: Dict[str, str], validators: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+    """
+    Sends a conditional GET (If-None-Match / If-Modified-Since) for the first page of each site.
+    Returns new validators of sites that were modified or couldn't be checked. Unmodified sites (304) are omitted.
+    """
+    changed = {}
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30), headers=HTTP_HEADERS) as session:
+        for w_name, link in urls.items():
+            old = validators.get(w_name, {})
+            headers = {}
+            if 'etag' in old:
+                headers['If-None-Match'] = old['etag']
+            if 'last_modified' in old:
+                headers['If-Modified-Since'] = old['last_modified']
+
+            try:
+                async with session.get(f'{link}/page/1/', headers=headers) as resp:
+                    if resp.status == 304:
+                        logging.info(f"{w_name} not modified since the last scraping.")
+                        continue
+                    etag, last_modified = resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.warning(f"Conditional request to {w_name} failed: {e}")
+                etag, last_modified = None, None
+
+            changed[w_name] = {}
+            if etag:
+                changed[w_name]['etag'] = etag
+            if last_modified:
+                changed[w_name]['last_modified'] = last_modified
+    return changed
+
+
+def load_site_validators() -> Dict[str, Dict[str, str]]:
+    try:
+        with open(SITES_VALIDATORS_PATH, encoding='utf-8') as inp:
+            return json.load(inp)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.error(f"Failed to load site validators from {SITES_VALIDATORS_PATH}: {e}")
+        return {}
+
+
+def save_site_validators(validators: Dict[str, Dict[str, str]]) -> None:
+    try:
+        os.makedirs(os.path.dirname(SITES_VALIDATORS_PATH), exist_ok=True)
+        with open(SITES_VALIDATORS_PATH, 'w', encoding='utf-8') as out:
+            json.dump(validators, out, indent=2)
+    except OSError as e:
+        logging.error(f"Failed to save site validators to {SITES_VALIDATORS_PATH}: {e}")
+
+
+async def scrape_new_data(urls: Dict[str, str], max_pages: int | None, data: List[MovieSite]) -> List[str]:
+    """Scrapes the sites and saves their data. Returns the names of the sites whose scraping returned movies."""
+    scraped = []
     counter = 0
     tasks_count = len(urls)
     st = datetime.now()
-    for i, (w_name, link) in enumerate(urls.items()):
+    sites = {w.name: w for w in data}
+    for w_name, link in urls.items():
         module = importlib.import_module(fr"scrape.{w_name}")
 
         logging.info(f"Scraping data from {w_name}...")
         # Run web scraping
         result = await module.scrape_movies(w_name, fr'{link}', max_pages)
+        if result:
+            scraped.append(w_name)
+        else:
+            logging.warning(f"No movies scraped from {w_name}.")
 
         # Join old data with new data
-        old_size = len(data[i].movies) if data else 0
-        data[i].add_movies(result, duplicates=False)
-        new_size = len(data[i].movies)
+        site = sites[w_name]
+        old_size = len(site.movies)
+        site.add_movies(result, duplicates=False)
+        new_size = len(site.movies)
         logging.info(f"{new_size - old_size} new movies added to data.")
 
         # Find invalid movies
-        invalid_data = data[i].filter_invalid_movies()
+        invalid_data = site.filter_invalid_movies()
 
-        save_csv(data[i], fr'{SITES_DATA_PATH}/{w_name}/{w_name}.csv')
-        save_pkl(data[i], fr'{SITES_DATA_PATH}/{w_name}/{w_name}.pkl')
+        save_csv(site, fr'{SITES_DATA_PATH}/{w_name}/{w_name}.csv')
+        save_pkl(site, fr'{SITES_DATA_PATH}/{w_name}/{w_name}.pkl')
         save_csv(invalid_data, fr'{SITES_DATA_PATH}/{w_name}/{w_name}-errors.csv')
 
         counter += 1
@@ -61,6 +142,7 @@ async def scrape_new_data(urls: Dict[str, str], max_pages: int | None, data: Lis
         logging.info(f"Done {counter}/{tasks_count} scraping operations.")
         logging.info(f"Remaining time approx: {ceil(time_remain.total_seconds() / 60)} min.")
     logging.info("Data collected and saved successfully.")
+    return scraped
 
 
 def load_scraped_data(sites: List[str]) -> List[MovieSite]:
@@ -81,8 +163,10 @@ def save_pkl(obj: Any, filename: str) -> None:
     try:
         # Make a directory if it doesn't exist
         os.makedirs(os.path.dirname(filename), exist_ok=True)
-        with open(filename, 'wb') as out:  # Overwrites any existing file.
+        tmp_filename = f'{filename}.tmp'
+        with open(tmp_filename, 'wb', buffering=PICKLE_BUFFER_SIZE) as out:
             pickle.dump(obj, out, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filename, filename)  # Atomically overwrites any existing file.
         logging.info(f"Object successfully saved to {filename}")
     except (OSError, pickle.PicklingError) as e:
         logging.error(f"Failed to save object to {filename}: {e}")
@@ -91,7 +175,7 @@ def save_pkl(obj: Any, filename: str) -> None:
 def load_pkl(filename: str, value: Any = None) -> Any:
     """Loads saved Python object from local data."""
     try:
-        with open(filename, 'rb') as inp:
+        with open(filename, 'rb', buffering=PICKLE_BUFFER_SIZE) as inp:
             return pickle.load(inp)
     except FileNotFoundError:
         logging.warning(f"File not found: {filename}")
@@ -104,6 +188,82 @@ def load_pkl(filename: str, value: Any = None) -> Any:
         return value
 
 
+def encode_user(data: Dict[str, Any]) -> str:
+    """Serializes User.to_dict() output to a JSON row (stable - to_dict() has a fixed key order)."""
+    return USER_JSON_ENCODER.encode(data)
+
+
+def content_hash(text: str) -> int:
+    """Computes a stable 64-bit hash of the text."""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def open_users_db(filename: str) -> sqlite3.Connection:
+    """Opens (creating if needed) the users database: one JSON row per user, keyed by user ID."""
+    # Make a directory if it doesn't exist
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    conn = sqlite3.connect(filename, check_same_thread=False)  # Written from save_user_data's worker thread
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS users(user_id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+    conn.commit()
+    return conn
+
+
+def save_users_db(conn: sqlite3.Connection, rows: List[Tuple[int, str]]) -> bool:
+    """Inserts or replaces the given (user ID, encode_user() row) pairs in a single transaction."""
+    try:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO users(user_id, data) VALUES (?, ?)", rows)
+        logging.info(f"{len(rows)} users successfully saved to the database")
+        return True
+    except sqlite3.Error as e:
+        logging.error(f"Failed to save users to the database: {e}")
+        return False
+
+
+def save_changed_users(
+        conn: sqlite3.Connection, snapshots: List[Tuple[int, Dict[str, Any]]], saved_hashes: Dict[int, int]
+) -> Optional[Dict[int, int]]:
+    """
+    Encodes the (user ID, User.to_dict()) snapshots and saves those that differ from the saved hashes.
+    Blocking - meant to run in a worker thread. Returns the hashes of the saved rows, None if saving failed.
+    """
+    rows, hashes = [], {}
+    for user_id, data in snapshots:
+        try:
+            row = encode_user(data)
+        except (TypeError, ValueError) as e:
+            logging.error(f"Failed to serialize user {user_id}: {e}")
+            continue
+        h = content_hash(row)
+        if saved_hashes.get(user_id) != h:
+            rows.append((user_id, row))
+            hashes[user_id] = h
+    if rows and not save_users_db(conn, rows):
+        return None
+    return hashes
+
+
+def load_users_db(conn: sqlite3.Connection) -> Optional[List[User]]:
+    """Loads all users from the database. Returns None if it is empty or can't be read."""
+    try:
+        rows = conn.execute("SELECT data FROM users").fetchall()
+        return [User.from_dict(json.loads(data)) for data, in rows] or None
+    except (sqlite3.Error, KeyError, TypeError, ValueError) as e:
+        logging.error(f"Failed to load users from the database: {e}")
+        return None
+
+
+def load_users(conn: sqlite3.Connection, legacy_pkl_filename: str) -> List[User]:
+    """Loads users from the database, falling back to the pickle file used before it (migrated on the next save)."""
+    users = load_users_db(conn)
+    if users is not None:
+        logging.info("Users loaded from the database")
+        return users
+    return load_pkl(legacy_pkl_filename, [])
+
+
 def save_csv(data: MovieSite, filename: str) -> None:
     """Saves site type class object as a csv type file."""
     columns = ['title', 'description', 'show_type', 'tags', 'year', 'length',
@@ -0,0 +1,26 @@
+import os
+from typing import Final, Optional, Dict
+
+from dotenv import load_dotenv
+
+# Load environment variables (once, on first import)
+load_dotenv()
+
+# Discord Bot token
+TOKEN: Final[str] = os.getenv('TOKEN', '')
+if not TOKEN:
+    raise ValueError(
+        f"Environment variable 'TOKEN' is not set. Please set it in the .env file before running the application.")
+
+# Path to the Chromium binary used by SeleniumBase (None - use the default browser)
+CHROMIUM_BINARY_PATH: Final[Optional[str]] = os.getenv('CHROMIUM_BINARY_PATH')
+
+# Headers of the bot's HTTP requests to the scraped sites (they block clients that don't look like a browser)
+HTTP_HEADERS: Final[Dict[str, str]] = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/127.0.0.0 Safari/537.36',
+    'Accept-Language': 'pl-PL,pl;q=0.9,en;q=0.8',
+}
+
+# Logging level name (e.g. DEBUG to log every user input and state change)
+LOG_LEVEL: Final[str] = os.getenv('LOG_LEVEL', 'INFO').upper()
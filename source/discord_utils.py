@@ -3,7 +3,7 @@ from typing import Optional, Union
 import logging
 
 from discord import Emoji, Reaction, PartialEmoji, Message, Embed, HTTPException, Forbidden, NotFound, TextChannel, \
-    File
+    File, abc
 
 
 async def delete_message(message: Message) -> None:
@@ -82,6 +82,24 @@ async def add_reaction(message: Message, emoji: Union[Emoji, Reaction, PartialEm
     return
 
 
+async def remove_reaction(
+        message: Message,
+        emoji: Union[Emoji, Reaction, PartialEmoji, str],
+        member: abc.Snowflake
+) -> None:
+    try:
+        await message.remove_reaction(emoji, member)
+    except NotFound as err:
+        logging.warning(f"Failed to remove reaction. Message not found: {err}.")
+    except Forbidden as err:
+        logging.error(f"Failed to remove reaction. Forbidden: {err}.")
+    except TypeError as err:
+        logging.error(f"Failed to remove reaction. Emoji parameter is invalid.: {err}.")
+    except HTTPException as err:
+        logging.error(f"Failed to remove reaction. HTTPException: {err}", exc_info=True)
+    return
+
+
 async def clear_reactions(message: Message) -> None:
     try:
         await message.clear_reactions()
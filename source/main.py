@@ -1,26 +1,36 @@
 import asyncio
+import functools
+import json
 import logging
-import os
+import queue
 import re
 import random
 import time
 from datetime import datetime
-from logging.handlers import TimedRotatingFileHandler
-from typing import Optional, Callable, List, Dict
+from itertools import groupby
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
+from operator import attrgetter
+from typing import Optional, Callable, List, Dict, Any, Union, Iterable
 
 import discord
 from discord import File
 from discord.ext import commands, tasks
 from discord.ext.commands import Context
-from dotenv import load_dotenv
 
 import collect_data
+from config import TOKEN, LOG_LEVEL
 from classes.enums import UserState, MovieTag, MovieTagColor
 from classes.movie import Movie
+from classes.movie_site import MovieSite
 from classes.user import User
 from classes.watchlist import MovieEntry
 from discord_utils import clear_reactions, edit_message, fetch_message, delete_message, add_reaction, \
-    send_message
+    send_message, remove_reaction
+
+try:
+    import uvloop  # libuv-based event loop (not available on Windows)
+except ImportError:
+    uvloop = None
 
 # Logging
 # Set up the log file handler to rotate daily
@@ -30,26 +40,23 @@ log_file_handler = TimedRotatingFileHandler(
     interval=1,  # Interval for rotation
     backupCount=10000,  # Number of backup files to keep
     encoding='utf-8',  # Encoding of the log file
-    utc=False  # UTC or local time
+    utc=False,  # UTC or local time
+    delay=True  # Open the file on the first record
 )
+log_stream_handler = logging.StreamHandler()
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+log_file_handler.setFormatter(log_formatter)
+log_stream_handler.setFormatter(log_formatter)
+# File and console writes happen in the listener's thread - logging on the event loop only enqueues the record
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, log_file_handler, log_stream_handler, respect_handler_level=True)
 # Set up logging configuration
 logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        log_file_handler,
-        logging.StreamHandler()
-    ]
+    level=LOG_LEVEL,
+    format='%(message)s',  # The queued record keeps only the message (and traceback), the listener formats it
+    handlers=[QueueHandler(log_queue)]
 )
-
-# Load environment variables
-load_dotenv()
-
-# Discord Bot token
-TOKEN = os.getenv('TOKEN')
-if not TOKEN:
-    raise ValueError(
-        f"Environment variable 'TOKEN' is not set. Please set it in the .env file before running the application.")
+log_listener.start()
 
 # Intents
 intents = discord.Intents.default()
@@ -65,23 +72,44 @@ help_command = commands.DefaultHelpCommand(
 activity = discord.Activity(type=discord.ActivityType.listening, name="m.help m.search m.watchlist")
 
 # Bot
-bot = discord.ext.commands.Bot(command_prefix=["m.", "M."], activity=activity, case_insensitive=True, intents=intents,
-                               help_command=help_command)
+COMMAND_PREFIXES = ("m.", "M.")  # Tuple - used directly by str.startswith in on_message
+bot = discord.ext.commands.Bot(command_prefix=COMMAND_PREFIXES, activity=activity, case_insensitive=True,
+                               intents=intents, help_command=help_command)
 
 # Constants
-TEXT_CHANNELS = {1267279190206451752, 1267248186410406023, 1279930397018427434}  # Discord channels IDs
+TEXT_CHANNELS = frozenset({1267279190206451752, 1267248186410406023, 1279930397018427434})  # Discord channels IDs
 USERS_PATH = "source/data/users"
 MAX_ROWS_SEARCH = 20  # Max number of rows showed in movie search
 MAX_ROWS_WATCHLIST = 20  # Max number of rows showed in watchlist
 MAX_FIELD_LENGTH = 1024  # Max length of the embed fields (up to 1024 characters limited by Discord)
 MIN_MATCH_SCORE = 35  # Minimum score of similarity in the search(0-100)
 INTERACTION_TIMEOUT = 1200.0  # Time in seconds for bot to track interactions
+SAVE_INTERVAL = 30.0  # Time in seconds between checks for changed users to save (a run without changes is free)
+SEARCH_CACHE_SIZE = 256  # Max number of search results kept in bot.g_search_cache
+TRACKED_MESSAGES_SIZE = 1024  # Max number of messages tracked in bot.g_sent_payloads and bot.g_panel_reactions
+TAG_BY_NUMBER = {str(i): t.value for i, t in enumerate(MovieTag, start=1)}  # Tag number shown in the filter prompt
+TAG_BY_NAME = {t.value.lower(): t.value for t in MovieTag}
+TAG_COLOURS = {t.value: MovieTagColor[t.name].value for t in MovieTag}  # Tag name -> embed colour
+RATING_PATTERN = re.compile(r'0*(?:10(?:[.,]0*)?|[1-9](?:[.,]\d*)?)')  # 1-10, e.g. '7', '7.5', '7,5'
+SEARCH_STATES = frozenset({UserState.search_movie, UserState.movie_details_search})
+WATCHLIST_STATES = frozenset({UserState.watchlist_panel, UserState.movie_details_watchlist})
+UNHANDLED_STATES = frozenset({UserState.idle})  # States that user input never runs a handler for
+YEAR_FILTER_PATTERN = re.compile(r'^\d+(?:-\d+)?(?:,\s*\d+(?:-\d+)?)*$')  # e.g. '1999, 2005-2010'
 
 # Global Bot values
-bot.g_locked = False
-bot.g_users = collect_data.load_pkl(f'{USERS_PATH}/users.pkl', [])  # List of Users with Movies lists.
-bot.g_sites = []  # List of Sites with Movies data
-bot.g_task_lock = asyncio.Lock()
+bot.g_users_db = collect_data.open_users_db(f'{USERS_PATH}/users.db')
+bot.g_users_by_id = {  # User ID -> User
+    u.id: u for u in collect_data.load_users(bot.g_users_db, f'{USERS_PATH}/users.pkl')
+}
+bot.g_user_hashes = {}  # User ID -> content hash of the last saved state (empty - first save writes all rows)
+bot.g_dirty_users = set(bot.g_users_by_id)  # IDs of users that may have changed since the last save
+bot.g_sites = ()  # Sites with Movies data (replaced as a whole, never modified in place)
+bot.g_site_headers = {}  # Site -> its header line in the search results
+bot.g_search_cache = {}  # (phrase, sort, filters) -> search result for the current bot.g_sites
+bot.g_sent_payloads = {}  # Message ID -> (content, embed JSON) of the last edit made by the bot
+bot.g_panel_reactions = {}  # Message ID -> (emojis added by the bot in order, {(emoji, user ID)} added by users)
+bot.g_reaction_waiters = {}  # User ID -> (future, check) of the reaction the user's panel is waiting for
+bot.g_text_waiters = {}  # User ID -> (future, check) of the message the user's panel is waiting for
 
 
 @bot.event
@@ -99,22 +127,31 @@ async def update_site_data() -> None:
     data = await collect_data.collect_data()
 
     logging.info("Loading data...")
-    bot.g_locked = True  # bot controls blocked
-    await asyncio.sleep(3)  # wait in case of handle state running
-    bot.g_sites = data
-    bot.g_locked = False
+    # No await in between - handlers never see new sites with headers or results cached for the old ones
+    bot.g_sites = tuple(data)
+    bot.g_site_headers = {s: f"**{str(s).upper()}:**\n" for s in data}
+    bot.g_search_cache.clear()
     logging.info(f"Using sites: {', '.join(w.name for w in bot.g_sites)}")
 
 
-@tasks.loop(minutes=5)
+@tasks.loop(seconds=SAVE_INTERVAL)
 async def save_user_data() -> None:
-    z1 = datetime.now()
+    start = time.perf_counter()
+
+    dirty_ids, bot.g_dirty_users = bot.g_dirty_users, set()
+    if not dirty_ids:  # Nobody interacted with the bot since the last save
+        return
 
-    users_copy = [user.copy_without_task() for user in bot.g_users]
-    collect_data.save_pkl(users_copy, f'{USERS_PATH}/users.pkl')
+    # Snapshot the dirty users on the event loop; encoding, change detection and writing run in a worker thread
+    snapshots = [(user_id, bot.g_users_by_id[user_id].to_dict()) for user_id in dirty_ids]
+    saved_hashes = await asyncio.to_thread(
+        collect_data.save_changed_users, bot.g_users_db, snapshots, bot.g_user_hashes)  # Only this task writes it
+    if saved_hashes is None:
+        bot.g_dirty_users.update(dirty_ids)  # Retry on the next run
+        return
+    bot.g_user_hashes.update(saved_hashes)
 
-    z2 = datetime.now()
-    logging.info("save_user_data(): " + str(z2 - z1))
+    logging.info("save_user_data(): %.3fs", time.perf_counter() - start)
 
 
 @bot.command(aliases=['szukaj', 's', 'filmy', 'films', 'movies'], brief='Wyszukiwanie filmów',
@@ -128,22 +165,20 @@ async def search(ctx: Context, *title: Optional[str]) -> None:
         - ctx (Context): The context in which the command was invoked.
         - title (Optional[str]): One or more words representing the movie title to search for.
     """
-    if ctx.channel.id not in TEXT_CHANNELS or bot.g_locked:
+    if ctx.channel.id not in TEXT_CHANNELS:
         return
 
     user = get_user(ctx.author.id)
 
     if not user:
-        # Add new User
-        user = User(ctx.author.id, ctx.author.name, ctx.author.display_name)
-        bot.g_users.append(user)
+        user = add_user(ctx.author)
+    mark_dirty(user)
 
     search_query = ' '.join(title) if title else ''
     ctx.message.content = search_query
 
-    fetched_message = await fetch_message(channel=ctx.channel, message_id=user.message_id)
-    if fetched_message:
-        await delete_message(fetched_message)
+    if user.message_id:  # Delete the previous panel - a partial message needs no fetch
+        await delete_message(ctx.channel.get_partial_message(user.message_id))
 
     await search_movie(ctx.message, is_command=True)
 
@@ -151,19 +186,17 @@ async def search(ctx: Context, *title: Optional[str]) -> None:
 @bot.command(aliases=['list', 'lista', 'w', 'wl', 'l'], brief='Pokaż swoją listę filmów',
              description='Wyświetla listę filmów użytkownika wraz z ocenami')
 async def watchlist(ctx: Context) -> None:
-    if ctx.channel.id not in TEXT_CHANNELS or bot.g_locked:
+    if ctx.channel.id not in TEXT_CHANNELS:
         return
 
     user = get_user(ctx.author.id)
 
     if not user:
-        # Add new User
-        user = User(ctx.author.id, ctx.author.name, ctx.author.display_name)
-        bot.g_users.append(user)
+        user = add_user(ctx.author)
+    mark_dirty(user)
 
-    fetched_message = await fetch_message(channel=ctx.channel, message_id=user.message_id)
-    if fetched_message:
-        await delete_message(fetched_message)
+    if user.message_id:  # Delete the previous panel - a partial message needs no fetch
+        await delete_message(ctx.channel.get_partial_message(user.message_id))
 
     await watchlist_panel(ctx.message, is_command=True)
 
@@ -171,41 +204,40 @@ async def watchlist(ctx: Context) -> None:
 @bot.command(aliases=['end', 'e'], brief='Wyjdź z interfejsu.',
              description='Kończy aktywną sesję użytkownika.')
 async def exit(ctx: Context) -> None:
-    if ctx.channel.id not in TEXT_CHANNELS or bot.g_locked:
+    if ctx.channel.id not in TEXT_CHANNELS:
         return
 
     user = get_user(ctx.author.id)
 
     if not user:
-        # Add new User
-        bot.g_users.append(User(ctx.author.id, ctx.author.name, ctx.author.display_name))
+        add_user(ctx.author)
         return
 
     if user.state is UserState.idle:
         return
 
-    fetched_message = await fetch_message(channel=ctx.channel, message_id=user.message_id)
+    mark_dirty(user)
+    fetched_message = await get_bot_message(channel=ctx.channel, message_id=user.message_id)
     if fetched_message:
-        user.interaction_task.cancel()
+        user.cancel_interaction_task()
         await end_session(message=fetched_message, user=user)
 
 
 @bot.event
 async def on_message(message: discord.Message) -> None:
     """Main message event handler."""
+    # Bots (including this one) never drive a panel and process_commands ignores them anyway
+    if message.author.bot:
+        return
+
     if (
-            bot.g_locked
-            or message.channel.id not in TEXT_CHANNELS
+            message.channel.id not in TEXT_CHANNELS
             or not is_user(message.author.id)
-            or message.content.startswith(tuple(bot.command_prefix))
+            or message.content.startswith(COMMAND_PREFIXES)
     ):
         await bot.process_commands(message)
         return
 
-    # Ignore bot's own messages
-    if message.author == bot.user:
-        return
-
     user = get_user(message.author.id)
     await process_state(message, user)
 
@@ -214,69 +246,58 @@ async def on_message(message: discord.Message) -> None:
 
 async def process_state(message: discord.Message, user: User) -> None:
     """Handles user input and executes the appropriate state handler."""
+    mark_dirty(user)
     old_state = user.state
-    blacklist = [UserState.idle]
-    state_functions = {
-        UserState.search_movie: search_movie,
-        UserState.movie_details_search: movie_details,
-        UserState.movie_details_watchlist: movie_details,
-        UserState.watchlist_panel: watchlist_panel,
-    }
 
     # Determine the new state based on the input
-    if message.content.isdecimal():  # Numeric input
-        if int(message.content) in range(1, len(user.movie_selection_list) + 1) and old_state in [
-            UserState.watchlist_panel,
-            UserState.movie_details_watchlist
-        ]:
+    content = message.content
+    if content.isascii() and content.isdigit():  # Numeric input (ASCII digits only)
+        selection = int(content)
+        if 1 <= selection <= len(user.movie_selection_list) and old_state in WATCHLIST_STATES:
             user.state = UserState.movie_details_watchlist
-        elif old_state in [
-            UserState.search_movie,
-            UserState.movie_details_search,
-        ]:
+        elif old_state in SEARCH_STATES:
             user.state = UserState.movie_details_search
         else:
-            logging.debug(f"Input: '{message.content}', Old State: '{old_state}', (returned)")
+            logging.debug("Input: '%s', Old State: '%s', (returned)", message.content, old_state)
             return
-    elif message.content.lower() == 'w':  # Go back
-        if old_state == UserState.movie_details_search:  # Movie details from search
+    elif content.lower() == 'w':  # Go back
+        if old_state is UserState.movie_details_search:  # Movie details from search
             user.state = UserState.search_movie
             message.content = user.search_query
-        elif old_state == UserState.movie_details_watchlist:  # Movie details from watchlist
+        elif old_state is UserState.movie_details_watchlist:  # Movie details from watchlist
             user.state = UserState.watchlist_panel
         else:
-            logging.debug(f"Input: '{message.content}', Old State: '{old_state}', (returned)")
+            logging.debug("Input: '%s', Old State: '%s', (returned)", message.content, old_state)
             return
     else:  # Non-numeric input
-        if old_state in [
-            UserState.search_movie,
-            UserState.movie_details_search,
-            UserState.movie_details_watchlist
-        ]:
+        if old_state in SEARCH_STATES or old_state is UserState.movie_details_watchlist:
             user.state = UserState.search_movie
         else:
-            logging.debug(f"Input: '{message.content}', Old State: '{old_state}', (returned)")
+            logging.debug("Input: '%s', Old State: '%s', (returned)", message.content, old_state)
             return
 
     new_state = user.state
-    logging.debug(f"Input: '{message.content}', Old State: '{old_state}', New state: '{new_state}'")
+    logging.debug("Input: '%s', Old State: '%s', New state: '%s'", message.content, old_state, new_state)
 
-    if new_state in blacklist:
-        logging.debug(f"No handler was executed ('{new_state}' is blacklisted for handler )")
+    if new_state in UNHANDLED_STATES:
+        logging.debug("No handler was executed ('%s' has no handler)", new_state)
         return
 
     # Execute the handler for the new state
-    handler = state_functions.get(new_state)
+    handler = STATE_HANDLERS.get(new_state)
     if not handler:
-        logging.warning(f"Unknown UserState: {new_state}")
+        logging.warning("Unknown UserState: %s", new_state)
         return
 
-    fetched_message = await fetch_message(channel=message.channel, message_id=user.message_id)
+    fetched_message = await get_bot_message(channel=message.channel, message_id=user.message_id)
     if fetched_message is None:
         user.state = UserState.idle
         return
 
-    logging.debug(f"Running handler: {handler.__name__}, Channel: '{str(message.channel)}'")
+    # Cancel the previous handler's wait for this user's input (its get_user_* call returns None)
+    user.cancel_interaction_task()
+
+    logging.debug("Running handler: %s, Channel: '%s'", handler.__name__, message.channel)
     await handler(message, fetched_message)
 
 
@@ -343,50 +364,59 @@ async def search_movie(
     ) -> discord.Embed:
         """Create the embed message with the current search results."""
         title = f"Wyszukiwarka filmów ({user.display_name})"
-        field_title, field_year_tags, field_rating = '', '', ''
+        title_rows, year_tags_rows, rating_rows = [], [], []
+        title_len = year_tags_len = rating_len = 0  # Lengths of the fields joined from the rows so far
         x = 1
+        line_break = "\u200B\n"
+
+        # Group the movies by site once, instead of scanning all of them for every site
+        movies_by_site: Dict[MovieSite, List[Movie]] = {}
+        for movie in movies:
+            movies_by_site.setdefault(movie.site, []).append(movie)
 
         for s in bot.g_sites:
-            site_name = f"**{str(s).upper()}:**\n"
-            line_break = "\u200B\n"
+            site_name = bot.g_site_headers[s]
 
             # Check field length limit
-            if (len(field_title) + len(site_name) > MAX_FIELD_LENGTH or
-                    len(field_year_tags) + len(line_break) > MAX_FIELD_LENGTH or
-                    len(field_rating) + len(line_break) > MAX_FIELD_LENGTH):
+            if (title_len + len(site_name) > MAX_FIELD_LENGTH or
+                    year_tags_len + len(line_break) > MAX_FIELD_LENGTH or
+                    rating_len + len(line_break) > MAX_FIELD_LENGTH):
                 break
 
             # Add site name to field_title and placeholders for alignment
-            field_title += site_name
-            field_year_tags += line_break
-            field_rating += line_break
-
-            for movie in movies:
-                if movie.site != s:  # Skip movies not from the current site
-                    continue
-
+            title_rows.append(site_name)
+            year_tags_rows.append(line_break)
+            rating_rows.append(line_break)
+            title_len += len(site_name)
+            year_tags_len += len(line_break)
+            rating_len += len(line_break)
+
+            for movie in movies_by_site.get(s, ()):
                 watched_mark = '✔' if user.watchlist.has_movie(movie) else ''
                 column_title = f"{watched_mark} {x}\u200B. {movie.title.split('/')[0]}"
                 column_year_tags = f"{movie.year}\u2003{movie.tags}"
                 column_rating = f"{movie.rating}"
 
                 # Limit Row Width
-                if len(column_title) >= 36:
-                    column_title = column_title[:33] + "..."
-                if len(column_year_tags) >= 25:
-                    column_year_tags = column_year_tags[:22].rstrip(",") + "..."
+                column_title = truncate_row(column_title, 36)
+                column_year_tags = truncate_row(column_year_tags, 25, strip_chars=",")
 
                 # Check field length limit
-                if (len(field_title) + len(column_title) + 1 > MAX_FIELD_LENGTH or
-                        len(field_year_tags) + len(column_year_tags) + 1 > MAX_FIELD_LENGTH or
-                        len(field_rating) + len(column_rating) + 1 > MAX_FIELD_LENGTH):
+                if (title_len + len(column_title) + 1 > MAX_FIELD_LENGTH or
+                        year_tags_len + len(column_year_tags) + 1 > MAX_FIELD_LENGTH or
+                        rating_len + len(column_rating) + 1 > MAX_FIELD_LENGTH):
                     break
 
-                field_title += column_title + "\n"
-                field_year_tags += column_year_tags + "\n"
-                field_rating += column_rating + "\n"
+                title_rows.append(column_title + "\n")
+                year_tags_rows.append(column_year_tags + "\n")
+                rating_rows.append(column_rating + "\n")
+                title_len += len(column_title) + 1
+                year_tags_len += len(column_year_tags) + 1
+                rating_len += len(column_rating) + 1
                 x += 1
 
+        field_title, field_year_tags, field_rating = ''.join(title_rows), ''.join(year_tags_rows), ''.join(rating_rows)
+
         if not movies:
             if not user_input and not selected_tags and not selected_years:
                 desc = "Brak filmów w bazie."
@@ -404,7 +434,7 @@ async def search_movie(
                     filtering_info += f'• **Gatunek**: {tags}\n'
 
                 if selected_years:
-                    years = list_to_range_string(selected_years)
+                    years = list_to_range_string(selected_years, assume_sorted=True)  # get_years_from_input sorts
                     if len(years) >= 100:
                         years = years[:97] + '...'
                     filtering_info += f'• **Rok produkcji**: {years}\n'
@@ -457,19 +487,11 @@ async def search_movie(
     def get_tags_from_input(input_str: str) -> List[str]:
         """Convert user input (numbers or tag names) to a list of MovieTag names as strings."""
         tags = []
-        input_parts = input_str.split(',')
-        tag_map = {str(x): t for x, t in enumerate(MovieTag, start=1)}  # Map numbers to tags
-
-        for p in input_parts:
+        for p in input_str.split(','):
             p = p.strip().lower()
-
-            if p.isdigit() and p in tag_map:  # If it's a number and in the tag map
-                tags.append(tag_map[p].value)
-            else:
-                for t in MovieTag:
-                    if t.value.lower() == p:  # If it's a tag name
-                        tags.append(t.value)
-                        break
+            tag = TAG_BY_NUMBER.get(p) or TAG_BY_NAME.get(p)  # Number from the list or tag name
+            if tag:
+                tags.append(tag)
         return tags
 
     def get_years_from_input(input_str: str) -> List[int]:
@@ -480,7 +502,7 @@ async def search_movie(
         min_year = 1900
         max_year = 2100
 
-        years = []
+        years = set()  # Overlapping ranges (e.g. "2000-2005, 2003") add each year once
         input_parts = input_str.split(',')
 
         for p in input_parts:
@@ -503,80 +525,141 @@ async def search_movie(
                 if y_end > max_year:
                     y_end = max_year
 
-                years.extend(range(y_start, y_end + 1))
+                years.update(range(y_start, y_end + 1))
             else:  # Handle single year (e.g., "2003")
                 if not p.isdigit():
                     continue
                 year = int(p)
                 if min_year <= year <= max_year:
-                    years.append(year)
+                    years.add(year)
 
         return sorted(years)
 
-    def list_to_range_string(numbers):
+    def list_to_range_string(numbers: List[int], assume_sorted: bool = False) -> str:
+        """Join numbers into ranges, e.g. [2000, 2001, 2002, 2005] -> "2000-2002, 2005"."""
         if not numbers:
             return ""
 
-        numbers = sorted(numbers)
+        if not assume_sorted:
+            numbers = sorted(numbers)
         ranges = []
-        start = numbers[0]
-        end = numbers[0]
+        start = end = numbers[0]
 
         for n in numbers[1:]:
             if n == end + 1:
                 end = n
             else:
-                if start == end:
-                    ranges.append(f"{start}")
-                else:
-                    ranges.append(f"{start}-{end}")
+                ranges.append(str(start) if start == end else f"{start}-{end}")
                 start = end = n
-
-        if start == end:
-            ranges.append(f"{start}")
-        else:
-            ranges.append(f"{start}-{end}")
+        ranges.append(str(start) if start == end else f"{start}-{end}")
 
         return ", ".join(ranges)
 
+    async def search_sites(by: Optional[str], ascending: bool) -> List[Movie]:
+        """Search every site with the current phrase and filters, sorted by the given key. Each site returns up to
+        MAX_ROWS_SEARCH."""
+        key = (user_input, by, ascending, tuple(selected_tags), tuple(selected_years))
+        if key in bot.g_search_cache:
+            return bot.g_search_cache[key]
+
+        sites = bot.g_sites
+        if user_input and by and by != 'match_score':
+            # With a phrase every site keeps its best matches whatever the sorting - re-sort the (cached) best
+            # matches in memory instead of matching all titles again
+            matches = await search_sites('match_score', True)
+            result = [
+                movie
+                for site, site_movies in groupby(matches, key=attrgetter('site'))
+                for movie in site.sort_matches(list(site_movies), by, reverse=not ascending)
+            ]
+        else:
+            # Fuzzy matching is CPU-bound - run it in worker threads to keep the event loop responsive
+            site_results = await asyncio.gather(*(
+                # Get specific search result if there is input or search for all movies if there is no input
+                asyncio.to_thread(
+                    site.search_movies,
+                    phrase=user_input,
+                    max_items=MAX_ROWS_SEARCH,
+                    min_match_score=MIN_MATCH_SCORE if user_input else 0.0,
+                    sort_key=by,
+                    reverse=not ascending,
+                    limit_before_sort=True if user_input else False,
+                    filter_tags=selected_tags,
+                    filter_years=selected_years
+                )
+                for site in sites
+            ))
+            result = [movie for site_movies in site_results for movie in site_movies]
+
+        if sites is bot.g_sites:  # Sites weren't replaced in the meantime
+            if len(bot.g_search_cache) >= SEARCH_CACHE_SIZE:
+                del bot.g_search_cache[next(iter(bot.g_search_cache))]  # Drop the oldest entry
+            bot.g_search_cache[key] = result
+        return result
+
+    results_embed: Optional[discord.Embed] = None
+    results_embed_movies: Optional[List[Movie]] = None
+    results_embed_key = None
+
+    def get_results_embed(movies: List[Movie]) -> discord.Embed:
+        """Return the search results embed, rebuilt only when the results, sorting or filters have changed."""
+        nonlocal results_embed, results_embed_movies, results_embed_key
+        key = (sort_key, sort_ascending, tuple(selected_tags), tuple(selected_years))
+        if results_embed is None or movies is not results_embed_movies or key != results_embed_key:
+            results_embed = make_search_results_embed(movies, show_sort_info=True, show_filter_info=True)
+            results_embed_movies, results_embed_key = movies, key
+        return results_embed  # The caller sets the footer
+
+    # Main panel reactions (the same in every iteration)
+    main_emoji_to_text = {
+        emoji_filter_tag: "Filtruj (Gatunek)",
+        emoji_filter_year: "Filtruj (Rok produkcji)",
+        emoji_sort: "Sortuj",
+        emoji_random: "Losuj film"
+    }
+    main_emojis = list(main_emoji_to_text.keys())
+    main_footer = make_footer(emoji_mapping=main_emoji_to_text)
+
+    # Sorting menus (emojis, footer) for every sort key and order
+    sort_by_options = {
+        'title': (emoji_sort_by_title, "Sortuj po Tytule"),
+        'year': (emoji_sort_by_year, "Sortuj po Roku produkcji"),
+        'rating': (emoji_sort_by_rating, "Sortuj po Ocenie"),
+        'date_added': (emoji_sort_by_date_added, "Sortuj po dacie dodania"),
+    }
+    sort_menus = {}
+    for menu_key in ('match_score', *sort_by_options):
+        for menu_ascending in (True, False):
+            emoji_to_text = {e: text for k, (e, text) in sort_by_options.items() if k != menu_key}
+            if menu_key != 'match_score':
+                if menu_ascending:
+                    emoji_to_text[emoji_sort_descending] = "Sortuj malejąco"
+                else:
+                    emoji_to_text[emoji_sort_ascending] = "Sortuj rosnąco"
+                emoji_to_text[emoji_sort_reset] = "Resetuj sortowanie"
+            emoji_to_text[emoji_sort_exit] = "Akceptuj"
+            sort_menus[menu_key, menu_ascending] = (list(emoji_to_text), make_footer(emoji_mapping=emoji_to_text))
+    sort_key_by_emoji = {e: k for k, (e, _) in sort_by_options.items()}
+    sort_ascending_by_emoji = {emoji_sort_ascending: True, emoji_sort_descending: False}
+
     # Main loop for handling user interactions
     while True:
         # Perform the search with sorting
-        result_movies = []
-        for site in bot.g_sites:
-            # Get specific search result if there is input or search for all movies if there is no input
-            site_movies = site.search_movies(
-                phrase=user_input,
-                max_items=MAX_ROWS_SEARCH,
-                min_match_score=MIN_MATCH_SCORE if user_input else 0.0,
-                sort_key=sort_key,
-                reverse=not sort_ascending,
-                limit_before_sort=True if user_input else False,
-                filter_tags=selected_tags,
-                filter_years=selected_years
-            )
-            result_movies.extend(site_movies)
+        result_movies = await search_sites(sort_key, sort_ascending)
 
         user.movie_selection_list = result_movies
 
-        embed = make_search_results_embed(result_movies, show_sort_info=True, show_filter_info=True)
-        emoji_to_text = {
-            emoji_filter_tag: "Filtruj (Gatunek)",
-            emoji_filter_year: "Filtruj (Rok produkcji)",
-            emoji_sort: "Sortuj",
-            emoji_random: "Losuj film"
-        }
-        footer = make_footer(emoji_mapping=emoji_to_text)
-        embed.set_footer(text=footer)
+        embed = get_results_embed(result_movies)
+        embed.set_footer(text=main_footer)
 
         if msg is None:
             msg = await send_message(channel=channel, embed=embed)
             user.message_id = msg.id
         else:
-            msg = await edit_message(message=msg, embed=embed)
+            msg = await edit_message_if_changed(message=msg, embed=embed)
 
         # Get user reaction for sorting
-        payload = await get_user_reaction(msg, list(emoji_to_text.keys()), user, INTERACTION_TIMEOUT)
+        payload = await get_user_reaction(msg, main_emojis, user, INTERACTION_TIMEOUT)
         if payload is None:
             return
 
@@ -584,87 +667,40 @@ async def search_movie(
 
         if selected_emoji == emoji_sort:  # Sorting menu
             while True:
-                # Prepare sorting options based on the current sort key
-                sort_options = {
-                    'match_score': {emoji_sort_by_title: "Sortuj po Tytule",
-                                    emoji_sort_by_year: "Sortuj po Roku produkcji",
-                                    emoji_sort_by_rating: "Sortuj po Ocenie",
-                                    emoji_sort_by_date_added: "Sortuj po dacie dodania"},
-                    'title': {emoji_sort_by_year: "Sortuj po Roku produkcji", emoji_sort_by_rating: "Sortuj po Ocenie",
-                              emoji_sort_by_date_added: "Sortuj po dacie dodania"},
-                    'year': {emoji_sort_by_title: "Sortuj po Tytule", emoji_sort_by_rating: "Sortuj po Ocenie",
-                             emoji_sort_by_date_added: "Sortuj po dacie dodania"},
-                    'rating': {emoji_sort_by_title: "Sortuj po Tytule", emoji_sort_by_year: "Sortuj po Roku produkcji",
-                               emoji_sort_by_date_added: "Sortuj po dacie dodania"},
-                    'date_added': {emoji_sort_by_title: "Sortuj po Tytule",
-                                   emoji_sort_by_year: "Sortuj po Roku produkcji",
-                                   emoji_sort_by_rating: "Sortuj po Ocenie"}
-                }
-                emoji_to_text = sort_options.get(sort_key, {})
-
-                # Sorting order options
-                if sort_key != 'match_score':
-                    if sort_ascending:
-                        emoji_to_text[emoji_sort_descending] = "Sortuj malejąco"
-                    else:
-                        emoji_to_text[emoji_sort_ascending] = "Sortuj rosnąco"
-                    emoji_to_text[emoji_sort_reset] = "Resetuj sortowanie"
-
-                emoji_to_text[emoji_sort_exit] = "Akceptuj"
+                sort_emojis, sort_footer = sort_menus[sort_key, sort_ascending]
 
                 # Update embed with sorting options
-                embed = make_search_results_embed(result_movies, show_sort_info=True, show_filter_info=True)
-                embed.set_footer(text=make_footer(emoji_mapping=emoji_to_text))
-                msg = await edit_message(message=msg, embed=embed)
+                embed = get_results_embed(result_movies)
+                embed.set_footer(text=sort_footer)
+                msg = await edit_message_if_changed(message=msg, embed=embed)
 
-                sort_payload = await get_user_reaction(msg, list(emoji_to_text.keys()), user, INTERACTION_TIMEOUT)
+                sort_payload = await get_user_reaction(msg, sort_emojis, user, INTERACTION_TIMEOUT)
                 if sort_payload is None:
                     return
 
                 sort_selected_emoji = str(sort_payload.emoji)
 
+                if sort_selected_emoji == emoji_sort_exit:
+                    break  # Exit sorting menu
                 if sort_selected_emoji == emoji_sort_reset:
                     sort_key = 'match_score'
                     sort_ascending = True
-                elif sort_selected_emoji == emoji_sort_by_title:
-                    sort_key = 'title'
-                elif sort_selected_emoji == emoji_sort_by_year:
-                    sort_key = 'year'
-                elif sort_selected_emoji == emoji_sort_by_rating:
-                    sort_key = 'rating'
-                elif sort_selected_emoji == emoji_sort_by_date_added:
-                    sort_key = 'date_added'
-                elif sort_selected_emoji == emoji_sort_descending:
-                    sort_ascending = False
-                elif sort_selected_emoji == emoji_sort_ascending:
-                    sort_ascending = True
-                elif sort_selected_emoji == emoji_sort_exit:
-                    break  # Exit sorting menu
+                else:
+                    sort_key = sort_key_by_emoji.get(sort_selected_emoji, sort_key)
+                    sort_ascending = sort_ascending_by_emoji.get(sort_selected_emoji, sort_ascending)
 
                 user.sort_key_search = sort_key
                 user.sort_ascending_search = sort_ascending
 
                 # Re-fetch and update the movies list based on the new sort settings
-                result_movies = []
-                for site in bot.g_sites:
-                    site_movies = site.search_movies(
-                        phrase=user_input,
-                        max_items=MAX_ROWS_SEARCH,
-                        min_match_score=MIN_MATCH_SCORE if user_input else 0.0,
-                        sort_key=sort_key,
-                        reverse=not sort_ascending,
-                        limit_before_sort=True if user_input else False,
-                        filter_tags=selected_tags,
-                        filter_years=selected_years
-                    )
-                    result_movies.extend(site_movies)
+                result_movies = await search_sites(sort_key, sort_ascending)
 
                 user.movie_selection_list = result_movies
 
         elif selected_emoji == emoji_filter_tag:  # Filter by tag
             user.state = UserState.input_search_filter
 
-            await clear_reactions(msg)
+            await clear_panel_reactions(msg)
 
             # Make list of tags from MovieTag Enum
             lines = []
@@ -679,7 +715,7 @@ async def search_movie(
             footer = make_footer(show_back_text=True)
             filter_embed = construct_embedded_message(title="Filtrowanie (Gatunek)", description=filter_prompt,
                                                       footer=footer)
-            msg = await edit_message(message=msg, embed=filter_embed)
+            msg = await edit_message_if_changed(message=msg, embed=filter_embed)
 
             # Get User input
             response = await get_user_text(msg, user, INTERACTION_TIMEOUT)
@@ -702,15 +738,13 @@ async def search_movie(
         elif selected_emoji == emoji_filter_year:  # Filter by year
             user.state = UserState.input_search_filter
 
-            await clear_reactions(msg)
+            await clear_panel_reactions(msg)
 
             filter_prompt = 'Wprowadź rok lub zakres lat (np. 2000-2005, 2012, 2024)'
             footer = make_footer(show_back_text=True)
             filter_embed = construct_embedded_message(title="Filtrowanie (Rok produkcji)", description=filter_prompt,
                                                       footer=footer)
-            msg = await edit_message(message=msg, embed=filter_embed)
-
-            pattern = r'^(\d+(-\d+)?)(,\s*\d+(-\d+)?)*$'
+            msg = await edit_message_if_changed(message=msg, embed=filter_embed)
 
             response = await get_user_text(
                 msg,
@@ -719,7 +753,7 @@ async def search_movie(
                 check=(
                     lambda m: m.author == user_message.author
                     and m.channel.id == msg.channel.id
-                    and (bool(re.match(pattern, m.content)) or m.content == 'w')
+                    and (YEAR_FILTER_PATTERN.match(m.content) is not None or m.content == 'w')
                 )
             )
 
@@ -738,15 +772,17 @@ async def search_movie(
             await delete_message(response)
             user.state = UserState.search_movie
         elif selected_emoji == emoji_random:  # Show random movie
-            while True:  # Pick random movie
-                filtered_movies = []
-                for site in bot.g_sites:
-                    site_movies = site.search_movies(
-                        filter_tags=selected_tags,
-                        filter_years=selected_years
-                    )
-                    filtered_movies.extend(site_movies)
+            # Pool of movies matching the filters - they can't change while picking, so it is built once
+            filtered_movies = []
+            for site in bot.g_sites:
+                site_movies = site.movies
+                if selected_tags:
+                    site_movies = site.filter_movies_by_tags(site_movies, selected_tags)
+                if selected_years:
+                    site_movies = site.filter_movies_by_years(site_movies, selected_years)
+                filtered_movies.extend(site_movies)
 
+            while True:  # Pick random movie
                 if filtered_movies:
                     prompt_random = (
                         "**🎲 Losowanie filmu**\n\n"
@@ -767,9 +803,9 @@ async def search_movie(
 
                 footer = make_footer(emoji_mapping=emoji_to_text)
                 embed.set_footer(text=footer)
-                await edit_message(message=msg, embed=embed)
+                await edit_message_if_changed(message=msg, embed=embed)
 
-                payload = await get_user_reaction(msg, list(emoji_to_text.keys()), user, INTERACTION_TIMEOUT)
+                payload = await get_user_reaction(msg, emoji_to_text.keys(), user, INTERACTION_TIMEOUT)
                 if payload is None:
                     return
 
@@ -777,7 +813,7 @@ async def search_movie(
 
                 if selected_emoji == emoji_back:  # Go back to the full list
                     break
-                elif selected_emoji in [emoji_random]:  # Pick random again
+                elif selected_emoji == emoji_random:  # Pick random again
                     continue
             continue
 
@@ -796,39 +832,27 @@ async def movie_details(user_message: discord.Message, bot_message: discord.Mess
         title = "Wyszukiwarka filmów (Brak użytkownika)"
         description = "**Użytkownik nie istnieje.**\n\n"
         embed = construct_embedded_message(title=title, description=description)
-        await delete_message(user_message)
-        await edit_message(message=msg, embed=embed)
+        await asyncio.gather(delete_message(user_message), edit_message_if_changed(message=msg, embed=embed))
         return
 
     title = f"Wyszukiwarka filmów ({user.display_name})"
     input_int = int(user_message.content)
 
-    if input_int not in range(1, len(user.movie_selection_list) + 1):
+    if not 1 <= input_int <= len(user.movie_selection_list):
         description = "**Wprowadzono liczbę poza zakresem.**\n\n"
         embed = construct_embedded_message(title=title, description=description)
         footer = make_footer(show_back_text=True)
         embed.set_footer(text=footer)
-        await delete_message(user_message)
-        await edit_message(message=msg, embed=embed)
+        await asyncio.gather(delete_message(user_message), edit_message_if_changed(message=msg, embed=embed))
         return
 
     user.selection_input = input_int
     selected_movie = user.movie_selection_list[input_int - 1]
 
-    rating = f"{selected_movie.rating}/10" if selected_movie.rating else "N/A"
-    basic_info_parts = []
-    if selected_movie.year:
-        basic_info_parts.append(f"{selected_movie.year}r")
-    if selected_movie.length:
-        basic_info_parts.append(f"{selected_movie.length}min")
-    if selected_movie.tags:
-        basic_info_parts.append(selected_movie.tags)
-    formatted_movie_basic_info = "\u2004|\u2004".join(basic_info_parts)
-
     description = (
-        f"**{formatted_movie_basic_info}**\n\n"
+        f"**{selected_movie.formatted_basic_info}**\n\n"
         f"{selected_movie.description}\n\n"
-        f"Ocena: {rating}\n"
+        f"Ocena: {selected_movie.rating_display}\n"
         f"{selected_movie.votes} głosów\n\n"
         f"Format: {selected_movie.show_type}\n"
         f"Kraje: {selected_movie.countries}\n\n"
@@ -836,12 +860,7 @@ async def movie_details(user_message: discord.Message, bot_message: discord.Mess
     )
 
     # Embed Colour
-    colour = None
-    if selected_movie.tags:
-        tag_value = selected_movie.tags.split(",")[0]
-        tag = next((t for t in MovieTag if t.value == tag_value), None)
-        if tag:
-            colour = MovieTagColor[tag.name].value
+    colour = TAG_COLOURS.get(selected_movie.tags.split(",", 1)[0]) if selected_movie.tags else None  # First tag
 
     # Make Embed
     if isinstance(colour, int):
@@ -850,21 +869,22 @@ async def movie_details(user_message: discord.Message, bot_message: discord.Mess
         embed = construct_embedded_message(title=selected_movie.title, description=description)
     embed.set_image(url=selected_movie.image_link)
 
-    # Prepare reaction emojis
-    if user.watchlist.has_movie(selected_movie):
-        emoji_to_text = {remove_from_watchlist_emoji: "Usuń z listy filmów", rate_movie_emoji: "Oceń film"}
-    else:
-        emoji_to_text = {add_to_watchlist_emoji: "Zapisz na liście filmów"}
+    # Prepare reaction emojis and footers (movie on / off the watchlist)
+    on_list_emoji_to_text = {remove_from_watchlist_emoji: "Usuń z listy filmów", rate_movie_emoji: "Oceń film"}
+    off_list_emoji_to_text = {add_to_watchlist_emoji: "Zapisz na liście filmów"}
+    on_list_menu = (list(on_list_emoji_to_text),
+                    make_footer(emoji_mapping=on_list_emoji_to_text, show_back_text=True))
+    off_list_menu = (list(off_list_emoji_to_text),
+                     make_footer(emoji_mapping=off_list_emoji_to_text, show_back_text=True))
+    emojis, footer_text = on_list_menu if user.watchlist.has_movie(selected_movie) else off_list_menu
 
     # Set footer, Delete User message, Edit Bot message
-    footer_text = make_footer(emoji_mapping=emoji_to_text, show_back_text=True)
     embed.set_footer(text=footer_text)
-    await delete_message(user_message)
-    msg = await edit_message(message=msg, embed=embed)
+    _, msg = await asyncio.gather(delete_message(user_message), edit_message_if_changed(message=msg, embed=embed))
 
     # Waiting for user reaction and updating message
     while True:
-        payload = await get_user_reaction(msg, list(emoji_to_text.keys()), user, INTERACTION_TIMEOUT)
+        payload = await get_user_reaction(msg, emojis, user, INTERACTION_TIMEOUT)
         if payload is None:
             return
         selected_emoji = str(payload.emoji)
@@ -872,24 +892,24 @@ async def movie_details(user_message: discord.Message, bot_message: discord.Mess
         # Change the status of the movie on the watchlist and update the footer
         if selected_emoji == add_to_watchlist_emoji:
             user.watchlist.add_movie(selected_movie)
-            emoji_to_text = {remove_from_watchlist_emoji: "Usuń z listy filmów", rate_movie_emoji: "Oceń film"}
+            emojis, footer_text = on_list_menu
         elif selected_emoji == remove_from_watchlist_emoji:
             user.watchlist.remove_movie(selected_movie)
-            emoji_to_text = {add_to_watchlist_emoji: "Zapisz na liście filmów"}
+            emojis, footer_text = off_list_menu
         elif selected_emoji == rate_movie_emoji:
             old_state = user.state
-            if old_state == UserState.movie_details_watchlist:
+            if old_state is UserState.movie_details_watchlist:
                 user.state = UserState.rate_movie_watchlist
             else:
                 user.state = UserState.rate_movie_search
 
-            await clear_reactions(msg)
+            await clear_panel_reactions(msg)
 
             # Prompt user to enter rating
             rating_prompt = "Wpisz ocenę filmu (1-10):"
             footer = make_footer(show_back_text=True)
             rating_embed = construct_embedded_message(title="Oceń Film", description=rating_prompt, footer=footer)
-            msg = await edit_message(message=msg, embed=rating_embed)
+            msg = await edit_message_if_changed(message=msg, embed=rating_embed)
 
             # Wait for user to enter a rating
             response = await get_user_text(
@@ -898,8 +918,8 @@ async def movie_details(user_message: discord.Message, bot_message: discord.Mess
                 INTERACTION_TIMEOUT,
                 check=(
                     lambda m: m.author == user_message.author
-                    and (m.content.replace(",", ".").replace(".", "", 1).isdigit() and 1 <= float(m.content.replace(",", ".")) <= 10 or m.content == 'w')
                     and m.channel.id == msg.channel.id
+                    and (m.content == 'w' or RATING_PATTERN.fullmatch(m.content) is not None)
                 )
             )
             if response is None:  # Timeout or cancel
@@ -921,15 +941,13 @@ async def movie_details(user_message: discord.Message, bot_message: discord.Mess
             footer = make_footer(text="m.list - otwiera listę filmów")
             rating_embed = construct_embedded_message(title="Oceniono Film", description=confirm_description,
                                                       footer=footer)
-            await delete_message(response)
-            await edit_message(message=msg, embed=rating_embed)
+            await asyncio.gather(delete_message(response), edit_message_if_changed(message=msg, embed=rating_embed))
 
-            time.sleep(2.5)
+            await asyncio.sleep(2.5)
             user.state = old_state
         # Update message
-        footer_text = make_footer(emoji_mapping=emoji_to_text, show_back_text=True)
         embed.set_footer(text=footer_text)
-        await edit_message(message=msg, embed=embed)
+        await edit_message_if_changed(message=msg, embed=embed)
 
 
 async def watchlist_panel(
@@ -968,8 +986,8 @@ async def watchlist_panel(
 
         await delete_message(user_message)
 
-    entries = user.watchlist.get_entries(sort_key=sort_key, reverse=not sort_ascending)
-    entries_count = len(entries)
+    # Sort in a worker thread (like the CSV export), so a long watchlist doesn't hold up other users' panels
+    entries = await asyncio.to_thread(user.watchlist.get_entries, sort_key=sort_key, reverse=not sort_ascending)
 
     if not entries:
         description = "**Twoja lista jest pusta.**\n" \
@@ -980,7 +998,7 @@ async def watchlist_panel(
             msg = await send_message(channel=channel, embed=embed)
             user.message_id = msg.id
         else:
-            await edit_message(message=msg, embed=embed)
+            await edit_message_if_changed(message=msg, embed=embed)
         user.movie_selection_list = []
         return
 
@@ -997,65 +1015,105 @@ async def watchlist_panel(
         else:
             sorting_info = ""
 
-        field_title = 'Tytuł\n'
-        field_date = 'Data dodania\n'
-        field_rating = 'Ocena\n'
-        for i, entry in enumerate(page_entries):
+        title_rows, date_rows, rating_rows = ['Tytuł\n'], ['Data dodania\n'], ['Ocena\n']
+        title_len, date_len, rating_len = len(title_rows[0]), len(date_rows[0]), len(rating_rows[0])
+        page_offset = (page_number - 1) * MAX_ROWS_WATCHLIST
+        for e_number, entry in enumerate(page_entries, start=page_offset + 1):
             e_title = entry.movie.title
             e_date = entry.date_added
             e_rating = '\u200B' if entry.rating is None else entry.rating
-            e_number = i + 1 + (page_number - 1) * MAX_ROWS_WATCHLIST
 
             column_title = f"{e_number}\u200B. {e_title}"
             column_date = f"{e_date}"
             column_rating = f"{e_rating}"
 
-            if len(column_title) >= 50:
-                column_title = column_title[:47] + "..."
+            column_title = truncate_row(column_title, 50)
 
-            if (len(field_title) + len(column_title) + 1 > MAX_FIELD_LENGTH or
-                    len(field_date) + len(column_date) + 1 > MAX_FIELD_LENGTH or
-                    len(field_rating) + len(column_rating) + 1 > MAX_FIELD_LENGTH):
+            if (title_len + len(column_title) + 1 > MAX_FIELD_LENGTH or
+                    date_len + len(column_date) + 1 > MAX_FIELD_LENGTH or
+                    rating_len + len(column_rating) + 1 > MAX_FIELD_LENGTH):
                 break
 
-            field_title += column_title + "\n"
-            field_date += column_date + "\n"
-            field_rating += column_rating + "\n"
+            title_rows.append(column_title + "\n")
+            date_rows.append(column_date + "\n")
+            rating_rows.append(column_rating + "\n")
+            title_len += len(column_title) + 1
+            date_len += len(column_date) + 1
+            rating_len += len(column_rating) + 1
+
+        field_title, field_date, field_rating = ''.join(title_rows), ''.join(date_rows), ''.join(rating_rows)
 
         desc = f"Strona {page_number} z {pages_count}\n{sorting_info}"
         emb = construct_embedded_message(field_title, field_date, field_rating, title=title,
                                          description=desc, colour=0xdfc118)
         return emb
 
-    pages = [entries[i:i + MAX_ROWS_WATCHLIST] for i in range(0, entries_count, MAX_ROWS_WATCHLIST)]
-    pages_count = len(pages)
+    pages_count = (len(entries) + MAX_ROWS_WATCHLIST - 1) // MAX_ROWS_WATCHLIST  # Pages are sliced when rendered
     current_page = 1
+    selection_list = [e.movie for e in entries]  # Rebuilt only when the sorting changes
+    page_embeds: Dict[tuple, discord.Embed] = {}
+    # Entries and selection list per sorting; the watchlist doesn't change while the panel is open
+    sortings: Dict[tuple, tuple[List[MovieEntry], List[Movie]]] = {
+        (sort_key, sort_ascending): (entries, selection_list)
+    }
 
-    while True:  # Main loop
-        # Prepare emojis based on the current page
-        emoji_to_text = {}
-        if pages_count > 1:
-            if current_page > 1:
+    def get_page_embed(page_number: int, show_sorting_info: bool = False) -> discord.Embed:
+        """Return the page embed, built once per page and sorting. The caller sets the footer."""
+        key = (page_number, sort_key, sort_ascending, show_sorting_info)
+        if key not in page_embeds:
+            page_entries = entries[(page_number - 1) * MAX_ROWS_WATCHLIST:page_number * MAX_ROWS_WATCHLIST]
+            page_embeds[key] = make_watchlist_embed(page_entries, page_number, show_sorting_info)
+        return page_embeds[key]
+
+    # Sorting menus (emojis, footer) for every sort key and order
+    sort_by_options = {
+        'title': (emoji_sort_by_title, "Sortuj po Tytule"),
+        'date_added': (emoji_sort_by_date_added, "Sortuj po Dacie dodania"),
+        'rating': (emoji_sort_by_rating, "Sortuj po Ocenie"),
+    }
+    sort_menus = {}
+    for menu_key in sort_by_options:
+        for menu_ascending in (True, False):
+            emoji_to_text = {e: text for k, (e, text) in sort_by_options.items() if k != menu_key}
+            if menu_ascending:
+                emoji_to_text[emoji_sort_descending] = "Sortuj malejąco"
+            else:
+                emoji_to_text[emoji_sort_ascending] = "Sortuj rosnąco"
+            emoji_to_text[emoji_sort_exit] = "Akceptuj"
+            sort_menus[menu_key, menu_ascending] = (list(emoji_to_text), make_footer(emoji_mapping=emoji_to_text))
+    sort_key_by_emoji = {e: k for k, (e, _) in sort_by_options.items()}
+    sort_ascending_by_emoji = {emoji_sort_ascending: True, emoji_sort_descending: False}
+
+    # Main menus (emojis, footer) keyed by (has previous page, has next page)
+    page_menus = {}
+    for has_previous in (False, True):
+        for has_next in (False, True):
+            emoji_to_text = {}
+            if has_previous:
                 emoji_to_text[emoji_previous_page] = "Wstecz"
-            if current_page < pages_count:
+            if has_next:
                 emoji_to_text[emoji_next_page] = "Dalej"
-        emoji_to_text[emoji_sort] = "Sortuj"
-        emoji_to_text[emoji_download] = "Pobierz listę"
+            emoji_to_text[emoji_sort] = "Sortuj"
+            emoji_to_text[emoji_download] = "Pobierz listę"
+            page_menus[has_previous, has_next] = (list(emoji_to_text), make_footer(emoji_mapping=emoji_to_text))
+
+    while True:  # Main loop
+        # Prepare emojis based on the current page
+        page_emojis, footer = page_menus[current_page > 1, current_page < pages_count]
 
         # Make embed and footer
-        embed = make_watchlist_embed(pages[current_page - 1], current_page)
-        footer = make_footer(emoji_mapping=emoji_to_text)
+        embed = get_page_embed(current_page)
         embed.set_footer(text=footer)
 
         if msg is None:  # Send a new message
             msg = await send_message(channel=channel, embed=embed)
             user.message_id = msg.id
         else:  # Edit the existing message
-            await edit_message(message=msg, embed=embed)
-        user.movie_selection_list = [e.movie for e in entries]
+            await edit_message_if_changed(message=msg, embed=embed)
+        user.movie_selection_list = selection_list
 
         # Get User reaction emoji
-        payload = await get_user_reaction(msg, list(emoji_to_text.keys()), user, INTERACTION_TIMEOUT)
+        payload = await get_user_reaction(msg, page_emojis, user, INTERACTION_TIMEOUT)
         if payload is None:
             return
 
@@ -1067,108 +1125,161 @@ async def watchlist_panel(
             current_page += 1
         elif selected_emoji == emoji_sort:  # Sort
             while True:
-                sort_options = {
-                    'title': {emoji_sort_by_date_added: "Sortuj po Dacie dodania",
-                              emoji_sort_by_rating: "Sortuj po Ocenie"},
-                    'date_added': {emoji_sort_by_title: "Sortuj po Tytule", emoji_sort_by_rating: "Sortuj po Ocenie"},
-                    'rating': {emoji_sort_by_title: "Sortuj po Tytule",
-                               emoji_sort_by_date_added: "Sortuj po Dacie dodania"}
-                }
-                emoji_to_text = sort_options.get(sort_key, {})
-                # Show sorting options
-                if sort_ascending:
-                    emoji_to_text[emoji_sort_descending] = "Sortuj malejąco"
-                else:
-                    emoji_to_text[emoji_sort_ascending] = "Sortuj rosnąco"
-                emoji_to_text[emoji_sort_exit] = "Akceptuj"
+                sort_emojis, sort_footer = sort_menus[sort_key, sort_ascending]
 
                 # Make embed and footer
-                embed = make_watchlist_embed(pages[current_page - 1], current_page, show_sorting_info=True)
-                footer = make_footer(emoji_mapping=emoji_to_text)
-                embed.set_footer(text=footer)
+                embed = get_page_embed(current_page, show_sorting_info=True)
+                embed.set_footer(text=sort_footer)
 
                 # Send updated embed with new sorting
-                await edit_message(message=msg, embed=embed)
+                await edit_message_if_changed(message=msg, embed=embed)
 
-                sort_payload = await get_user_reaction(msg, list(emoji_to_text.keys()), user, INTERACTION_TIMEOUT)
+                sort_payload = await get_user_reaction(msg, sort_emojis, user, INTERACTION_TIMEOUT)
                 if sort_payload is None:
                     return
 
                 sort_selected_emoji = str(sort_payload.emoji)
+                previous_sorting = (sort_key, sort_ascending)
 
-                if sort_selected_emoji == emoji_sort_by_title:
-                    sort_key = 'title'
-                elif sort_selected_emoji == emoji_sort_by_date_added:
-                    sort_key = 'date_added'
-                elif sort_selected_emoji == emoji_sort_by_rating:
-                    sort_key = 'rating'
-                elif sort_selected_emoji == emoji_sort_descending:
-                    sort_ascending = False
-                elif sort_selected_emoji == emoji_sort_ascending:
-                    sort_ascending = True
-                elif sort_selected_emoji == emoji_sort_exit:
+                if sort_selected_emoji == emoji_sort_exit:
                     break  # Exit the sorting menu
+                sort_key = sort_key_by_emoji.get(sort_selected_emoji, sort_key)
+                sort_ascending = sort_ascending_by_emoji.get(sort_selected_emoji, sort_ascending)
+
+                if (sort_key, sort_ascending) == previous_sorting:
+                    continue
 
                 user.sort_key_watchlist = sort_key
                 user.sort_ascending_watchlist = sort_ascending
-                entries = user.watchlist.get_entries(sort_key=sort_key, reverse=not sort_ascending)
 
-                # Update pages and page count
-                pages = [entries[i:i + MAX_ROWS_WATCHLIST] for i in range(0, len(entries), MAX_ROWS_WATCHLIST)]
-                pages_count = len(pages)
+                # Update the sorted entries (switching back to an earlier sorting reuses it)
+                if (sort_key, sort_ascending) not in sortings:
+                    entries = await asyncio.to_thread(
+                        user.watchlist.get_entries, sort_key=sort_key, reverse=not sort_ascending
+                    )
+                    sortings[sort_key, sort_ascending] = (entries, [e.movie for e in entries])
+                entries, selection_list = sortings[sort_key, sort_ascending]
                 current_page = 1  # Reset to the first page
-                user.movie_selection_list = [e.movie for e in entries]
+                user.movie_selection_list = selection_list
         elif selected_emoji == emoji_download:  # Download list
-            # Create the CSV file in memory
-            csv_file = user.watchlist.get_csv(sort_key=sort_key, reverse=not sort_ascending)
+            # Create the CSV file in a worker thread, so other users' panels keep responding meanwhile
+            csv_file = await asyncio.to_thread(user.watchlist.get_csv, sort_key=sort_key, reverse=not sort_ascending)
             date_string = datetime.now().strftime("%Y-%m-%d")
             discord_file = File(fp=csv_file, filename=f"{user.display_name} {date_string}.csv")
-            await clear_reactions(msg)
+            await clear_panel_reactions(msg)
             await send_message(channel=msg.channel, file=discord_file)
-            time.sleep(5)  # Use sleep to prevent spamming download requests
+            csv_file.close()  # Frees the buffer (or the temporary file of a large export)
+            await asyncio.sleep(5)  # Use sleep to prevent spamming download requests
 
-        # Update message after page change
-        embed = make_watchlist_embed(pages[current_page - 1], current_page)
-        msg = await edit_message(message=msg, embed=embed)
+
+# Handler run by process_state for each state the user input leads to
+STATE_HANDLERS = {
+    UserState.search_movie: search_movie,
+    UserState.movie_details_search: movie_details,
+    UserState.movie_details_watchlist: movie_details,
+    UserState.watchlist_panel: watchlist_panel,
+}
+
+
+def wait_for_user_event(
+        waiters: Dict[int, tuple[asyncio.Future, Callable]],
+        controller: User,
+        check: Callable,
+        timeout: Optional[float] = None
+) -> asyncio.Task:
+    """
+    Wait for the next event of the user accepted by the check. Events are routed to the waiting user by the
+    route_reaction / route_text listeners, so each event runs at most one check instead of one per open panel.
+    The returned task raises asyncio.TimeoutError on timeout and cancels the wait when cancelled.
+    """
+    def forget_waiter(_: asyncio.Future) -> None:
+        # Drop the finished wait right away, so abandoned sessions don't keep their check (and panel) alive
+        waiter = waiters.get(user_id)
+        if waiter is not None and waiter[0] is future:
+            del waiters[user_id]
+
+    user_id = controller.id
+    future = asyncio.get_running_loop().create_future()
+    future.add_done_callback(forget_waiter)
+    waiters[user_id] = (future, check)  # Replaces the user's previous wait
+    return asyncio.create_task(asyncio.wait_for(future, timeout))
+
+
+def resolve_user_event(waiters: Dict[int, tuple[asyncio.Future, Callable]], user_id: int, event) -> None:
+    """Complete the user's wait with the event if its check accepts it."""
+    waiter = waiters.get(user_id)
+    if waiter is None:
+        return
+    future, check = waiter
+    if not future.done() and check(event):
+        future.set_result(event)  # Its done callback removes the wait
+
+
+@bot.listen('on_raw_reaction_add')
+async def route_reaction(payload: discord.RawReactionActionEvent) -> None:
+    panel = bot.g_panel_reactions.get(payload.message_id)
+    if panel is not None and payload.user_id != bot.user.id:
+        panel[1].add((str(payload.emoji), payload.user_id))  # To be taken back before the next wait
+    resolve_user_event(bot.g_reaction_waiters, payload.user_id, payload)
+
+
+@bot.listen('on_message')
+async def route_text(message: discord.Message) -> None:
+    resolve_user_event(bot.g_text_waiters, message.author.id, message)
 
 
 async def get_user_reaction(
         message: discord.Message,
-        emojis: List[str],
+        emojis: Iterable[str],
         controller: Optional[User] = None,
         timeout: Optional[float] = None,
         check: Callable[[discord.MessageInteraction], bool] | None = None
 ) -> Optional[discord.RawReactionActionEvent]:
     def check_default(payload: discord.RawReactionActionEvent):
-        # CONDITIONS CHECK (1.user, 2.message, 3.emoji)
-        user_id, msg_id, emoji = payload.user_id, payload.message_id, str(payload.emoji)
-        id_list = [p.id for p in bot.g_users]
+        # CONDITIONS CHECK (1.message, 2.emoji, 3.user) - the most selective first
         return (
-                (user_id == controller.id if controller else user_id in id_list)  # 1
-                and (msg_id == message.id)  # 2
-                and (emoji in emojis)  # 3
+                payload.message_id == message.id  # 1
+                and str(payload.emoji) in emoji_set  # 2
+                and (payload.user_id == controller.id if controller else payload.user_id in bot.g_users_by_id)  # 3
         )
 
+    emojis = list(emojis)  # Own snapshot (callers may pass dict keys), kept as the panel's emoji row
+    emoji_set = frozenset(emojis)
+
     # Create task
-    new_task = asyncio.create_task(bot.wait_for(
-        "raw_reaction_add",
-        timeout=timeout,
-        check=check if check is not None else check_default
-    ))
-
-    async with bot.g_task_lock:
-        if controller:
-            # Cancel old task if exists
-            old_task = controller.interaction_task
-            if old_task and not old_task.done():
-                old_task.cancel()
-            # Save new task
-            controller.interaction_task = new_task
-
-    # Update reactions
-    await clear_reactions(message)
-    for e in emojis:
-        await add_reaction(message=message, emoji=e)
+    if controller:
+        new_task = wait_for_user_event(bot.g_reaction_waiters, controller, check or check_default, timeout)
+        controller.replace_interaction_task(new_task)
+    else:
+        new_task = asyncio.create_task(bot.wait_for(
+            "raw_reaction_add",
+            timeout=timeout,
+            check=check if check is not None else check_default
+        ))
+
+    # Update reactions - requests are issued together and discord.py's rate limiter queues them in order
+    panel = bot.g_panel_reactions.get(message.id)
+    remember_message(bot.g_panel_reactions, message.id, (emojis, set()))  # Users' reactions from now on
+    kept = [e for e in panel[0] if e in emoji_set] if panel is not None else []
+    dropped = [e for e in panel[0] if e not in emoji_set] if panel is not None else []
+    if (panel is not None and emojis[:len(kept)] == kept
+            and len(dropped) + len(panel[1]) <= 1 + len(kept)):  # Requests saved by keeping vs. clearing
+        # The row only loses emojis and/or grows at the end - take back the dropped emojis and the users' reactions,
+        # then add the missing emojis
+        await asyncio.gather(
+            *(remove_reaction(message, e, bot.user) for e in dropped),
+            *(remove_reaction(message, e, discord.Object(id=u)) for e, u in panel[1]),
+        )
+        missing = emojis[len(kept):]
+    else:
+        await clear_reactions(message)
+        missing = emojis
+
+    adding = asyncio.gather(*(add_reaction(message=message, emoji=e) for e in missing))
+    await asyncio.wait({adding, new_task}, return_when=asyncio.FIRST_COMPLETED)
+    if not adding.done():  # User already reacted (or the task was cancelled) - the rest would be cleared anyway
+        adding.cancel()
+        bot.g_panel_reactions.pop(message.id, None)  # The row is incomplete - rebuild it next time
 
     # Wait for the reaction
     try:
@@ -1177,9 +1288,11 @@ async def get_user_reaction(
         logging.debug("Reaction task was cancelled.")
         return None
     except asyncio.TimeoutError:
-        logging.debug(f"Reaction task timeout")
+        logging.debug("Reaction task timeout")
         await end_session(message=message, user=controller)
         return None
+    if controller:
+        mark_dirty(controller)  # the caller is about to act on the reaction
     return reaction_payload
 
 
@@ -1192,25 +1305,19 @@ async def get_user_text(
     def check_default(msg: discord.Message):
         # CONDITIONS CHECK (1.user, 2.message)
         user_id = msg.author.id
-        id_list = [p.id for p in bot.g_users]
-        return (user_id == controller.id if controller else user_id in id_list) and (
+        return (user_id == controller.id if controller else user_id in bot.g_users_by_id) and (
                 msg.channel.id in TEXT_CHANNELS)
 
     # Create and update user task
-    new_task = asyncio.create_task(bot.wait_for(
-        'message',
-        timeout=timeout,
-        check=check if check is not None else check_default
-    ))
-
-    async with bot.g_task_lock:
-        if controller:
-            # Cancel old task if exists
-            old_task = controller.interaction_task
-            if old_task and not old_task.done():
-                old_task.cancel()
-            # Save new task
-            controller.interaction_task = new_task
+    if controller:
+        new_task = wait_for_user_event(bot.g_text_waiters, controller, check or check_default, timeout)
+        controller.replace_interaction_task(new_task)
+    else:
+        new_task = asyncio.create_task(bot.wait_for(
+            'message',
+            timeout=timeout,
+            check=check if check is not None else check_default
+        ))
 
     # Wait for the text
     try:
@@ -1219,51 +1326,117 @@ async def get_user_text(
         logging.debug("Text task was cancelled.")
         return None
     except asyncio.TimeoutError:
-        logging.debug(f"Text task timeout")
+        logging.debug("Text task timeout")
         await end_session(message=message, user=controller)
         return None
+    if controller:
+        mark_dirty(controller)  # the caller is about to act on the text
     return message_payload
 
 
 async def end_session(message: discord.Message, user: Optional[User] = None):
-    await clear_reactions(message)
+    await clear_panel_reactions(message)
     if message.embeds:
         embed = message.embeds[0]
         embed.remove_footer()
         if user.state != UserState.movie_details_watchlist and user.state != UserState.movie_details_search:
             embed.colour = 0xff0000
         embed.description = "`Sesja wygasła. Spróbuj ponownie.`\n\n" + embed.description
-        await edit_message(message, embed=embed)
+        await edit_message_if_changed(message, embed=embed)
     else:
-        await edit_message(message, content='Zakończono')
+        await edit_message_if_changed(message, content='Zakończono')
     if user:
         user.state = UserState.idle
+        mark_dirty(user)
+
+
+async def get_bot_message(channel: discord.abc.Messageable, message_id: int) -> Optional[discord.Message]:
+    """
+    Return the bot's message with the given ID in the channel. Messages the bot sent recently are taken from the
+    client's message cache (kept up to date by gateway events), others are fetched from the API.
+    """
+    if not message_id:  # User has no message yet
+        return None
+    message = discord.utils.get(reversed(bot.cached_messages), id=message_id)
+    if message is not None:
+        return message if message.channel.id == channel.id else None
+    return await fetch_message(channel=channel, message_id=message_id)
+
+
+async def edit_message_if_changed(
+        message: discord.Message,
+        content: Optional[str] = None,
+        embed: Optional[discord.Embed] = None
+) -> Optional[discord.Message]:
+    """Edit the message unless the bot's last edit of it already set the same content and embed."""
+    # JSON snapshot - Embed.to_dict() shares the embed's field list, which may be mutated later
+    payload = (content, json.dumps(embed.to_dict(), sort_keys=True) if embed else None)
+    if bot.g_sent_payloads.get(message.id) == payload:
+        return message
+
+    edited_message = await edit_message(message, content=content, embed=embed)
+    if edited_message is None:
+        bot.g_sent_payloads.pop(message.id, None)
+        return None
+
+    remember_message(bot.g_sent_payloads, message.id, payload)
+    return edited_message
+
+
+def remember_message(cache: Dict[int, Any], message_id: int, value: Any) -> None:
+    """Store the value as the newest entry of the message cache, dropping the oldest one when it is full."""
+    cache.pop(message_id, None)
+    if len(cache) >= TRACKED_MESSAGES_SIZE:
+        del cache[next(iter(cache))]
+    cache[message_id] = value
+
+
+async def clear_panel_reactions(message: discord.Message) -> None:
+    """Remove all reactions from the message and forget its tracked reaction row."""
+    bot.g_panel_reactions.pop(message.id, None)
+    await clear_reactions(message)
 
 
 def is_user(user_id: int):
-    return any(user.id == user_id for user in bot.g_users)
+    return user_id in bot.g_users_by_id
 
 
 def get_user(user_id: int):
-    for user in bot.g_users:
-        if user.id == user_id:
-            return user
-    return None
+    return bot.g_users_by_id.get(user_id)
+
+
+def add_user(member: discord.abc.User) -> User:
+    """Create a new User for the Discord member and register it in the bot."""
+    user = User(member.id, member.name, member.display_name)
+    bot.g_users_by_id[user.id] = user
+    mark_dirty(user)
+    return user
+
+
+def mark_dirty(user: User) -> None:
+    """Flag the user to be written by the next save_user_data run."""
+    bot.g_dirty_users.add(user.id)
 
 
 def construct_embedded_message(*fields: str, title: str = '', description: str = '', footer: str = '',
-                               colour: int = 0x734ef8) -> discord.Embed:
-    embed = discord.Embed(
-        title=title,
-        colour=discord.Colour(colour),
-        description=description,
-    )
+                               colour: Union[int, discord.Colour] = 0x734ef8) -> discord.Embed:
+    # Embed takes an int colour as is; empty title/description/footer are left out of the payload
+    embed = discord.Embed(colour=colour, title=title or None, description=description or None)
     for f in fields:
         embed.add_field(name="", value=f, inline=True)
-    embed.set_footer(text=footer)
+    if footer:
+        embed.set_footer(text=footer)
     return embed
 
 
+@functools.lru_cache(maxsize=4096)
+def truncate_row(text: str, max_width: int, strip_chars: str = '') -> str:
+    """Shorten the row text to below max_width with '...' (cached - the same rows are rendered over and over)."""
+    if len(text) < max_width:
+        return text
+    return text[:max_width - 3].rstrip(strip_chars) + "..."
+
+
 def make_footer(text: str = None, show_back_text: bool = False, emoji_mapping: Optional[Dict[str, str]] = None) -> str:
     """Creates a footer string from emoji-to-text mapping."""
     footer_parts = []
@@ -1276,4 +1449,18 @@ def make_footer(text: str = None, show_back_text: bool = False, emoji_mapping: O
     return " | ".join(footer_parts)
 
 
-bot.run(TOKEN)
+async def main() -> None:
+    async with bot:
+        await bot.start(TOKEN)
+
+
+try:
+    # Like bot.run(), but on uvloop when it is available (logging is already set up above)
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
+except KeyboardInterrupt:
+    pass
+finally:
+    log_listener.stop()  # Write out the queued records
@@ -1,63 +1,380 @@
+import asyncio
+import atexit
+import functools
+import hashlib
+import json
 import logging
 import os
 import re
-from datetime import datetime
-from typing import List, Any
+import threading
+import time
+from typing import List, Any, Optional, Iterable, Awaitable, TypeVar
+from urllib.parse import urljoin
 
-from selenium.common import NoSuchElementException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
-from seleniumbase import Driver
+import aiohttp
+from lxml import etree, html
 
 from classes.types_base import Movie as MoviePayload
+from config import CHROMIUM_BINARY_PATH, HTTP_HEADERS
 from to_thread import to_thread
 
-CHROMIUM_BINARY_PATH = os.getenv('CHROMIUM_BINARY_PATH')
+MAX_CONNECTIONS = 32  # Open connections of the HTTP session
+MAX_CONCURRENT_REQUESTS = 16  # Pages downloaded at once - keeps the load on the site reasonable
+BLOCKED_STATUSES = frozenset({403, 429, 503})  # Responses of an anti-bot protection (e.g. Cloudflare challenge)
+MOVIE_CACHE_DIR = "source/data/sites/cda-hd/cache"  # Scraped movie details, one JSON file per movie URL
 
+NUMBER_PATTERN = re.compile(r'\d+')
+DECIMAL_PATTERN = re.compile(r'\d+(\.\d+)?')
+LENGTH_PATTERN = re.compile(r'(\d+)\s*(h|min)', re.IGNORECASE)  # Hours or minutes, e.g. 1 h 45 min
+YEAR_PATTERN = re.compile(r'[0-9]+')
+RATING_PATTERN = re.compile(r'[0-9]+[.,]?[0-9]*|[.,][0-9]+')  # e.g. 7, 7.5, 7,5
 
+# XPath expressions compiled once (used for pages downloaded over HTTP and pages rendered by the browser)
+XPATH_LAST_PAGE_HREF = etree.XPath("//a[normalize-space()='Ostatnia']/@href")
+XPATH_MOVIE_LIST = etree.XPath("//*[contains(concat(' ', normalize-space(@class), ' '), ' item_1 ')]")
+XPATH_MOVIE_ITEMS = etree.XPath(".//*[contains(concat(' ', normalize-space(@class), ' '), ' item ')]")
+XPATH_ITEM_HREF = etree.XPath(".//a/@href")
+XPATH_TITLE = etree.XPath("//*[@id='uwee']/div[2]/h1")
+XPATH_DESCRIPTION = etree.XPath("//*[@id='cap1']/p")
+XPATH_DESCRIPTION_ALT = etree.XPath("//*[@id='cap1']/div/p")
+XPATH_TAGS = etree.XPath("//*[@id='uwee']//a[@rel='category tag']")
+XPATH_YEAR = etree.XPath("//*[@id='uwee']/div[2]/span")
+XPATH_YEAR_ALT = etree.XPath("//*[@id='uwee']/div[2]/p[1]/span[1]/a")
+XPATH_LENGTH = etree.XPath("//*[contains(@class, 'icon-time')]/..")
+XPATH_RATING = etree.XPath("//*[@id='uwee']/div[2]/div[2]/a/div/span")
+XPATH_VOTES = etree.XPath("//*[@id='uwee']/div[2]/div[2]/div/span/b[2]")
+XPATH_COUNTRIES = etree.XPath("//*[@id='uwee']/div[2]/p[4]")
+XPATH_IMAGE = etree.XPath("//*[@id='uwee']/div[1]/div/img")
+
+
+T = TypeVar('T')
+
+
+class BlockedError(Exception):
+    """The site refused plain HTTP requests - pages have to be loaded in a real browser."""
+
+
+@functools.lru_cache(maxsize=4096)  # Same texts repeat across movie pages (years, lengths)
 def find_first_number(text: str, find_decimal: bool = False, remove_separator: bool = True) -> str:
     """Finds the first number in the text."""
     if remove_separator:
         text = text.replace(',', '')
-    pattern = r'\d+(\.\d+)?' if find_decimal else r'\d+'
-    match = re.search(pattern, text)
+    pattern = DECIMAL_PATTERN if find_decimal else NUMBER_PATTERN
+    match = pattern.search(text)
     return match.group() if match else ""
 
 
+@functools.lru_cache(maxsize=4096)
 def find_last_number(text: str, find_decimal: bool = False, remove_separator: bool = True) -> str:
     """Finds the last number in the text."""
     if remove_separator:
         text = text.replace(',', '')
-    pattern = r'\d+(\.\d+)?' if find_decimal else r'\d+'
-    matches = list(re.finditer(pattern, text))
-    return matches[-1].group() if matches else ""
+    pattern = DECIMAL_PATTERN if find_decimal else NUMBER_PATTERN
+    match = None
+    for match in pattern.finditer(text):  # Keep only the last match, without collecting them in a list
+        pass
+    return match.group() if match else ""
 
 
+def parse_year(text: str) -> int | None:
+    """Returns the year in the text (digits only) if it's a plausible production year."""
+    if not YEAR_PATTERN.fullmatch(text):
+        return None
+    year = int(text)
+    return year if 1900 < year < 2100 else None
+
+
+@functools.lru_cache(maxsize=4096)
 def extract_minutes(text: str, default: Any = None) -> int | None:
     """Extracts total minutes from a time string which could contain hours (h) and minutes (min)."""
-    text = text.lower()
-    total_minutes = 0
+    # One scan for both units - the first number of each unit counts
+    hours = minutes = None
+    for match in LENGTH_PATTERN.finditer(text):
+        if match.group(2).lower() == 'h':
+            if hours is None:
+                hours = int(match.group(1))
+        elif minutes is None:
+            minutes = int(match.group(1))
+        if hours is not None and minutes is not None:
+            break
+
+    total_minutes = (hours or 0) * 60 + (minutes or 0)
+    return total_minutes if total_minutes else default
 
-    # Extract hours if present
-    hours_match = re.search(r'(\d+)\s*h', text)
-    if hours_match:
-        hours = hours_match.group(1)
-        total_minutes += int(hours) * 60
 
-    # Extract minutes if present
-    minutes_match = re.search(r'(\d+)\s*min', text)
-    if minutes_match:
-        minutes = minutes_match.group(1)
-        total_minutes += int(minutes)
+async def scrape_movies(site_name: str, site_link: str, max_pages: int | None) -> List[MoviePayload]:
+    """Scrape movies with plain HTTP requests, falling back to the browser if the site blocks them."""
+    try:
+        return await scrape_movies_http(site_name, site_link, max_pages)
+    except BlockedError as e:
+        logging.warning(f"{site_name} blocked HTTP scraping ({e}). Falling back to the browser.")
+        return await scrape_movies_browser(site_name, site_link, max_pages)
 
-    return total_minutes if total_minutes else default
+
+def movie_cache_filename(url: str) -> str:
+    return f'{hashlib.sha1(url.encode("utf-8")).hexdigest()}.json'
+
+
+def list_cached_movies() -> set[str]:
+    """Returns the file names of the cached movies (see movie_cache_filename)."""
+    try:
+        return set(os.listdir(MOVIE_CACHE_DIR))
+    except FileNotFoundError:
+        return set()
+
+
+def load_cached_movie(filename: str) -> Optional[MoviePayload]:
+    try:
+        with open(os.path.join(MOVIE_CACHE_DIR, filename), encoding='utf-8') as inp:
+            return json.load(inp)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Failed to load cached movie {filename}: {e}")
+        return None
+
+
+def save_cached_movie(filename: str, movie: MoviePayload) -> None:
+    try:
+        os.makedirs(MOVIE_CACHE_DIR, exist_ok=True)
+        path = os.path.join(MOVIE_CACHE_DIR, filename)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as out:
+            json.dump(movie, out, ensure_ascii=False)
+        os.replace(tmp_path, path)  # Never leaves a partially written movie behind
+    except (OSError, TypeError, ValueError) as e:
+        logging.warning(f"Failed to cache movie {filename}: {e}")
+
+
+def element_text(tree: html.HtmlElement, xpath: etree.XPath) -> str:
+    """Returns the whitespace-normalized text of the first element matching the xpath (like WebElement.text)."""
+    elements = xpath(tree)
+    if not elements:
+        raise LookupError(f"No element matches {xpath.path}")
+    return ' '.join(elements[0].text_content().split())
+
+
+async def fetch_page(session: aiohttp.ClientSession, url: str) -> str:
+    """Downloads the page. Raises BlockedError if an anti-bot protection answered instead of the site."""
+    async with session.get(url) as resp:
+        text = await resp.text()
+        if resp.status in BLOCKED_STATUSES or '_cf_chl_opt' in text:
+            raise BlockedError(f"HTTP {resp.status} for {url}")
+        resp.raise_for_status()
+    return text
+
+
+def parse_pages_count(text: str, url: str) -> int:
+    tree = html.fromstring(text)
+    hrefs = XPATH_LAST_PAGE_HREF(tree)
+    if not hrefs:
+        raise BlockedError(f"no 'Ostatnia' link in {url}")  # Challenge page or content rendered by scripts
+    pages_match = NUMBER_PATTERN.search(hrefs[0])  # Only the first number (the page) is used
+    if not pages_match:
+        raise ValueError(f"Cannot process element: 'page_count' ({hrefs[0]})")
+    return int(pages_match.group())
+
+
+def parse_movie_links(text: str, url: str) -> List[str]:
+    tree = html.fromstring(text)
+    sectors = XPATH_MOVIE_LIST(tree)
+    if not sectors:
+        raise BlockedError(f"no movie list in {url}")
+    items = XPATH_MOVIE_ITEMS(sectors[0])
+    links = (urljoin(url, hrefs[0]) for hrefs in (XPATH_ITEM_HREF(item) for item in items) if hrefs)
+    return list(dict.fromkeys(links))  # Each movie once, in the order of the page
+
+
+def parse_movie(text: str, url: str) -> MoviePayload:
+    """Extracts the movie details from its page. Raises LookupError if a required element is missing."""
+    tree = html.fromstring(text)
+
+    title: str = element_text(tree, XPATH_TITLE)
+
+    try:
+        description = element_text(tree, XPATH_DESCRIPTION)
+    except LookupError:
+        description_elements = XPATH_DESCRIPTION_ALT(tree)
+        description: str = ' '.join(description_elements[0].text_content().split()) if description_elements else ""
+
+    show_type: str = "Film"
+
+    tags_elements = XPATH_TAGS(tree)
+    tags: str = ', '.join(' '.join(t.text_content().split()) for t in tags_elements)
+
+    year_text = element_text(tree, XPATH_YEAR)
+    year = parse_year(find_last_number(year_text))
+    if not year:
+        year = parse_year(element_text(tree, XPATH_YEAR_ALT))
+
+    length_text = element_text(tree, XPATH_LENGTH)
+    length = extract_minutes(length_text)
+
+    rating_str = element_text(tree, XPATH_RATING)
+    rating = float(rating_str.replace(',', '.')) if RATING_PATTERN.fullmatch(rating_str) else None
+
+    votes_text = element_text(tree, XPATH_VOTES)
+    votes_str = find_first_number(votes_text)
+    votes = int(votes_str) if votes_str.isdigit() else None
+
+    countries = element_text(tree, XPATH_COUNTRIES)
+    countries = '' if countries.isdigit() else countries
+
+    images = XPATH_IMAGE(tree)
+    if not images:
+        raise LookupError(f"No element matches {XPATH_IMAGE.path}")
+    image_link = urljoin(url, images[0].get('src', ''))
+
+    return MoviePayload(
+        title=title,
+        description=description,
+        show_type=show_type,
+        tags=tags,
+        year=year,
+        length=length,
+        rating=rating,
+        votes=votes,
+        countries=countries,
+        link=url,
+        image_link=image_link
+    )
+
+
+async def gather_all(coroutines: Iterable[Awaitable[T]]) -> List[T]:
+    """Runs the coroutines concurrently like asyncio.gather, but cancels the rest if one of them raises."""
+    tasks = [asyncio.create_task(c) for c in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+async def scrape_movie_links(
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        url: str,
+        text: Optional[str] = None
+) -> List[str]:
+    """Returns the movie links of a listing page (text - the page, if it was downloaded already)."""
+    if text is None:
+        async with semaphore:
+            try:
+                text = await fetch_page(session, url)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.warning(f"Error downloading movies list {url}: {e}")
+                return []
+    return await asyncio.to_thread(parse_movie_links, text, url)
+
+
+async def scrape_movie(
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        url: str,
+        cached: set[str]
+) -> Optional[MoviePayload]:
+    """Returns the movie details, from the cache (cached - list_cached_movies()) if the movie was scraped before."""
+    filename = movie_cache_filename(url)
+    if filename in cached:
+        movie = await asyncio.to_thread(load_cached_movie, filename)
+        if movie is not None:
+            return movie
+
+    async with semaphore:
+        try:
+            text = await fetch_page(session, url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.warning(f"Error downloading movie details for URL {url}: {e}")
+            return None
+    try:
+        # Parsing is CPU-bound - keep it off the event loop
+        movie = await asyncio.to_thread(parse_movie, text, url)
+    except Exception:
+        logging.warning(f"Error extracting movie details for URL {url}")
+        return None
+    await asyncio.to_thread(save_cached_movie, filename, movie)
+    return movie
+
+
+async def scrape_movies_http(site_name: str, site_link: str, max_pages: int | None) -> List[MoviePayload]:
+    start = time.perf_counter_ns()
+
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HTTP_HEADERS) as session:
+        # Get number of pages with movies
+        first_page_url = f'{site_link}/page/1/'
+        try:
+            text = await fetch_page(session, first_page_url)
+            pages_count = await asyncio.to_thread(parse_pages_count, text, first_page_url)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logging.warning(f"Error 1 in cda-hd.get_movies(): {e}, site_name = {site_name}")
+            return []
+        pages_count = min(max_pages, pages_count) if max_pages else pages_count
+
+        # Pages don't depend on each other - download them concurrently (results keep the order of the pages)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        logging.info(f"Pages: {pages_count}...")
+        pages_hrefs = await gather_all(
+            scrape_movie_links(session, semaphore, f'{site_link}/page/{page_number}/',
+                               text if page_number == 1 else None)
+            for page_number in range(1, pages_count + 1)
+        )
+        hrefs = list(dict.fromkeys(h for page_hrefs in pages_hrefs for h in page_hrefs))  # Pages may overlap
+
+        logging.info(f"Movies: {len(hrefs)}...")
+        cached = await asyncio.to_thread(list_cached_movies)
+        results = await gather_all(scrape_movie(session, semaphore, h, cached) for h in hrefs)
+        movies = [m for m in results if m is not None]
+
+        logging.info(f"Found {len(movies)} movies.")
+
+    logging.info(f"cda-hd.get_movies() completed: {(time.perf_counter_ns() - start) / 1e9:.3f}s")
+    return movies
+
+
+browser_lock = threading.Lock()  # The shared browser serves one scraping at a time
+browser: Any = None  # seleniumbase Driver, started on the first use and reused by later scrapings
+
+
+def get_browser() -> Any:
+    """Returns the shared browser, starting it if needed. Call with browser_lock held."""
+    global browser
+    if browser is None:
+        # Imported only when needed - the browser is just a fallback for sites blocking plain HTTP requests
+        from seleniumbase import Driver
+        # Pages are read from the DOM only - don't wait for (or download) images, the DOM is enough
+        browser = Driver(uc=True, headless=True, binary_location=CHROMIUM_BINARY_PATH,
+                         page_load_strategy='eager', block_images=True)
+    return browser
+
+
+def quit_browser() -> None:
+    """Quits the shared browser (if running), so the next scraping starts a new one."""
+    global browser
+    if browser is not None:
+        try:
+            browser.quit()
+        except Exception as e:
+            logging.warning(f"Failed to quit the browser: {e}")
+        browser = None
+
+
+atexit.register(quit_browser)
 
 
 @to_thread
-def scrape_movies(site_name: str, site_link: str, max_pages: int | None) -> List[MoviePayload]:
-    browser = Driver(uc=True, headless=True, binary_location=CHROMIUM_BINARY_PATH)
-    a = datetime.now()
+def scrape_movies_browser(site_name: str, site_link: str, max_pages: int | None) -> List[MoviePayload]:
+    with browser_lock:
+        return scrape_movies_in_browser(get_browser(), site_name, site_link, max_pages)
+
+
+def scrape_movies_in_browser(browser, site_name: str, site_link: str, max_pages: int | None) -> List[MoviePayload]:
+    from selenium.common.exceptions import WebDriverException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    start = time.perf_counter_ns()
     movies = []
 
     # Get number of pages with movies
@@ -68,97 +385,61 @@ def scrape_movies(site_name: str, site_link: str, max_pages: int | None) -> List
         )
         href_last_page = element_last_page.get_attribute("href")
     except Exception as e:
-        browser.close()
+        quit_browser()  # Start over with a new browser next time
         logging.warning(f"Error 1 in cda-hd.get_movies(): {e}")
         return []
 
-    scheme_list = re.findall(r'\d+', href_last_page)
-    if not scheme_list:
-        browser.close()
+    pages_match = NUMBER_PATTERN.search(href_last_page)  # Only the first number (the page) is used
+    if not pages_match:
         logging.warning(f"Cannot process element: 'page_count', site_name = {site_name}")
         return []
 
     try:
-        pages_count = min(max_pages, int(scheme_list[0])) if max_pages else int(scheme_list[0])
+        pages_count = min(max_pages, int(pages_match.group())) if max_pages else int(pages_match.group())
+        seen_hrefs = set()
+        cached = list_cached_movies()
 
         for page_number in range(1, pages_count + 1):
             # Get page with movies
             logging.info(f"Page: {page_number}/{pages_count}...")
 
-            browser.default_get(f'{site_link}/page/{page_number}/')
-
-            sector = browser.find_element(By.CLASS_NAME, "item_1")
-            elements = sector.find_elements(By.CLASS_NAME, "item")
-            hrefs = [e.find_element(By.TAG_NAME, "a").get_attribute('href') for e in elements]
+            page_url = f'{site_link}/page/{page_number}/'
+            try:
+                browser.default_get(page_url)
+            except WebDriverException as e:
+                # A single failed page shouldn't cost the movies scraped so far - retry it once, then skip it
+                logging.warning(f"Error loading movies list {page_url}: {e}. Retrying...")
+                try:
+                    browser.refresh()
+                except WebDriverException as e:
+                    logging.warning(f"Error loading movies list {page_url}: {e}")
+                    continue
+            # Read the rendered page once and extract everything from it with lxml (no WebDriver call per field)
+            hrefs = [h for h in parse_movie_links(browser.page_source, page_url) if h not in seen_hrefs]
+            seen_hrefs.update(hrefs)  # Pages may overlap (e.g. when movies are added during the scraping)
 
             for h in hrefs:
+                filename = movie_cache_filename(h)
+                movie = load_cached_movie(filename) if filename in cached else None
+                if movie is not None:
+                    movies.append(movie)
+                    continue
+
                 # Single Movie url
-                browser.default_get(h)
                 try:
-                    # XPATH - faster than CSS Selector
-                    title: str = browser.find_element(By.XPATH, "//*[@id='uwee']/div[2]/h1").text
-
-                    try:
-                        description = browser.find_element(By.XPATH, "//*[@id='cap1']/p").text
-                    except NoSuchElementException:
-                        description_elements = browser.find_elements(By.XPATH, "//*[@id='cap1']/div/p")
-                        description: str = description_elements[0].text if description_elements else ""
-
-                    show_type: str = "Film"
-
-                    tags_elements = browser.find_elements(By.XPATH, "//*[@id='uwee']//a[@rel='category tag']")
-                    tags: str = ', '.join(t.text for t in tags_elements)
-
-                    year_text = browser.find_element(By.XPATH, "//*[@id='uwee']/div[2]/span").text
-                    year_str = find_last_number(year_text)
-                    year = int(year_str) if year_str.isdigit() and 1900 < int(year_str) < 2100 else None
-                    if not year:
-                        year_str = browser.find_element(By.XPATH, "//*[@id='uwee']/div[2]/p[1]/span[1]/a").text
-                        year = int(year_str) if year_str.isdigit() and 1900 < int(year_str) < 2100 else None
-
-                    length_text = browser.find_element(By.XPATH, "//*[contains(@class, 'icon-time')]/..").text
-                    length = extract_minutes(length_text)
-
-                    rating_str = browser.find_element(By.XPATH, "//*[@id='uwee']/div[2]/div[2]/a/div/span").text
-                    rating = float(rating_str.replace(',', '.')) if rating_str.replace(',', '.').replace('.', '', 1).isdigit() else None
-
-                    votes_text = browser.find_element(By.XPATH, "//*[@id='uwee']/div[2]/div[2]/div/span/b[2]").text
-                    votes_str = find_first_number(votes_text)
-                    votes = int(votes_str) if votes_str.isdigit() else None
-
-                    countries = browser.find_element(By.XPATH, "//*[@id='uwee']/div[2]/p[4]").text
-                    countries = '' if countries.isdigit() else countries
-
-                    image_link = browser.find_element(By.XPATH, "//*[@id='uwee']/div[1]/div/img").get_attribute("src")
-                    link: str = h
-
-                    movies.append(
-                        MoviePayload(
-                            title=title,
-                            description=description,
-                            show_type=show_type,
-                            tags=tags,
-                            year=year,
-                            length=length,
-                            rating=rating,
-                            votes=votes,
-                            countries=countries,
-                            link=link,
-                            image_link=image_link
-                        )
-                    )
+                    browser.default_get(h)
+                    movie = parse_movie(browser.page_source, h)
                 except Exception:
                     logging.warning(f"Error extracting movie details for URL {h}")
                     continue
+                save_cached_movie(filename, movie)
+                movies.append(movie)
 
         logging.info(f"Found {len(movies)} movies.")
 
     except Exception as e:
+        quit_browser()  # Start over with a new browser next time
         logging.warning(f"Error scraping movies: {e}")
 
-    finally:
-        browser.quit()
-
-    b = datetime.now()
-    logging.info(f"cda-hd.get_movies() completed: {b - a}")
+    logging.info(f"cda-hd.get_movies() completed: {(time.perf_counter_ns() - start) / 1e9:.3f}s")
     return movies